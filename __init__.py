@@ -2,5 +2,6 @@
 
 import os
 
-datapath = os.path.dirname(__file__)
-os.chdir(os.path.join(datapath, "data"))
+# Data files are always found through absolute paths, so importing the
+# package never touches the working directory.
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
@@ -2,13 +2,40 @@
 
 """Main script."""
 
+import argparse
+
 from tripeg.game import MainGame
-from tripeg.graphics import TurtleGraphics
+from tripeg.gamelog import FILENAME, GameLog
+
+def _hole(text):
+    """Parses an 'X,Y' hole given on the command line."""
+    return tuple(int(coord) for coord in text.split(","))
 
-def main():
+def main(argv=None):
     """Main function."""
-    game = MainGame()
-    game(TurtleGraphics())
+    parser = argparse.ArgumentParser(prog="python -m tripeg")
+    parser.add_argument("--empty", metavar="X,Y", type=_hole,
+                        help="hole that starts empty (default: 4,8, the "
+                        "top)")
+    parser.add_argument("--solver", metavar="ADDRESS",
+                        help="get hints from the solver service at ADDRESS "
+                        "(see 'python -m tripeg.server')")
+    parser.add_argument("--no-log", action="store_true",
+                        help="do not record games (by default they are "
+                        "appended to {})".format(FILENAME))
+    args = parser.parse_args(argv)
+    log = None if args.no_log else GameLog()
+    try:
+        game = MainGame(empty=args.empty, log=log)
+    except ValueError as error:
+        parser.error(str(error))
+    # Imported here so that only the GUI pays for tkinter and turtle.
+    from tripeg.graphics import TurtleGraphics
+    path_finder = None
+    if args.solver:
+        from tripeg.server import SolverClient
+        path_finder = SolverClient(args.solver)
+    game(TurtleGraphics(path_finder))
 
 if __name__ == "__main__":
     main()
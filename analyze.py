@@ -0,0 +1,108 @@
+"""Bulk analysis of games recorded by 'GameLog'.
+
+Run with 'python -m tripeg.analyze [LOG ...]'. Every move of every game
+is compared with the best move in its position: a move gives up as many
+pegs as the best final peg count after it exceeds the best one before
+it. One 'PathFinder' per board size is shared by every game read, so
+positions that recur across games, such as common openings, are solved
+only once. Logs are streamed, so memory use depends on the positions
+seen rather than on the number of games.
+"""
+
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+from tripeg.bitboard import BitboardGame
+from tripeg.gamelog import FILENAME, GameLog
+from tripeg.movepaths import DummyGame, PathFinder
+
+def analyze_game(path_finder, recorded):
+    """Returns a dictionary describing 'recorded', a 'RecordedGame', with
+    the number of pegs given up by each of its moves."""
+    game = BitboardGame(recorded.rows, recorded.empty)
+    game()
+    game = DummyGame(game)
+    losses = []
+    best_pegs = None
+    for index in recorded.moves:
+        scores = {move: score for score, move in
+                  path_finder.rank_moves(game)}
+        best_score = min(scores.values())
+        if best_pegs is None:
+            best_pegs = best_score
+        move = game.table.moves[index]
+        if move not in scores:
+            raise ValueError("illegal move {}".format(move))
+        losses.append(scores[move] - best_score)
+        game.play(index)
+    return {"rows": recorded.rows, "empty": recorded.empty,
+            "moves": len(losses), "finished": not game.find_legal_indices(),
+            "pegs": game.peg_count, "best_pegs": best_pegs,
+            "given_up": sum(losses), "losses": losses}
+
+def analyze(games, maxsize=None):
+    """Analyzes every game in 'games' and yields the result of
+    'analyze_game' for each."""
+    path_finders = {}
+    for recorded in games:
+        if recorded.rows not in path_finders:
+            path_finders[recorded.rows] = PathFinder(maxsize)
+        yield analyze_game(path_finders[recorded.rows], recorded)
+
+def _read_logs(filenames):
+    """Yields every game in the logs 'filenames', in order."""
+    for filename in filenames:
+        yield from GameLog(filename)
+
+def main(argv=None):
+    """Parses arguments, analyzes the logs and prints a summary."""
+    parser = argparse.ArgumentParser(prog="python -m tripeg.analyze",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="*", default=[FILENAME],
+                        help="game logs (default: the GUI's log)")
+    parser.add_argument("--maxsize", type=int, default=1000000,
+                        help="maximum positions kept in the solver's "
+                        "cache (default: 1000000)")
+    parser.add_argument("--per-game", action="store_true",
+                        help="print one JSON line per game")
+    args = parser.parse_args(argv)
+    if args.maxsize < 1:
+        parser.error("--maxsize must be at least 1")
+    for filename in args.logs:
+        if os.path.exists(filename):
+            continue
+        if filename == FILENAME:
+            parser.exit(message="No games have been recorded yet.\n")
+        parser.error("{}: no such game log".format(filename))
+    # Keeps standard output pure JSON lines when those are requested.
+    summary = sys.stderr if args.per_game else sys.stdout
+    games = moves = given_up = perfect = 0
+    by_move = []
+    start = perf_counter()
+    for result in analyze(_read_logs(args.logs), args.maxsize):
+        games += 1
+        moves += result["moves"]
+        given_up += result["given_up"]
+        perfect += result["finished"] and not result["given_up"]
+        for number, loss in enumerate(result["losses"]):
+            if number == len(by_move):
+                by_move.append([0, 0])
+            by_move[number][0] += loss
+            by_move[number][1] += 1
+        if args.per_game:
+            sys.stdout.write(json.dumps(result) + "\n")
+    elapsed = perf_counter() - start
+    print("{} games, {} moves in {:.2f} s ({:.0f} games/s)".format(
+        games, moves, elapsed, games/elapsed if elapsed else 0),
+          file=summary)
+    print("{} pegs given up ({:.3f} per move); {} perfect games".format(
+        given_up, given_up/moves if moves else 0, perfect), file=summary)
+    for number, (loss, count) in enumerate(by_move, 1):
+        print("move {:>2}: {:.3f} pegs given up on average over {} "
+              "games".format(number, loss/count, count), file=summary)
+
+if __name__ == "__main__":
+    main()
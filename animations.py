@@ -14,12 +14,13 @@ class Arrow(RawPen):
                  pensize=2)
         self.goto(self.graphics.HADES)
 
-    def draw(self, origin, destination):
-        """Draws arrow from 'origin' to 'destination'."""
+    def draw(self, origin, destination, color="green"):
+        """Draws arrow from 'origin' to 'destination' in 'color'."""
+        self.pen(pencolor=color, fillcolor=color)
         self.goto(origin)
         self.setheading(self.towards(destination))
         self.pendown()
-        self.dot(10, "green")
+        self.dot(10, color)
         self.goto(destination)
 
     def banish(self):
@@ -0,0 +1,94 @@
+"""Vectorized evaluation of many board positions at once.
+
+Requires NumPy. Boards can be given either as packed bitmasks (any
+integer array, see 'MoveTable') or as a boolean matrix with one row per
+board and one column per hole. Boards with more than 64 holes are not
+supported.
+"""
+
+import numpy as np
+
+from tripeg.bitboard import MOVE_TABLE
+from tripeg.game import BaseGame
+
+def _masks(values):
+    """Converts a tuple of Python int masks into a uint64 array."""
+    return np.array(values, dtype=np.uint64)
+
+def to_bits(boards, table=MOVE_TABLE):
+    """Returns 'boards' as a 1-D uint64 array of packed bitmasks."""
+    boards = np.asarray(boards)
+    if boards.dtype == np.bool_:
+        if boards.ndim != 2 or boards.shape[1] != len(table.holes):
+            raise ValueError("boolean boards must have one column per hole")
+        weights = np.left_shift(np.uint64(1), np.arange(len(table.holes),
+                                                        dtype=np.uint64))
+        return (boards.astype(np.uint64)*weights).sum(axis=1,
+                                                      dtype=np.uint64)
+    return boards.astype(np.uint64).reshape(-1)
+
+def to_matrix(boards, table=MOVE_TABLE):
+    """Returns 'boards' as a boolean matrix with one column per hole."""
+    bits = to_bits(boards, table)
+    shifts = np.arange(len(table.holes), dtype=np.uint64)
+    return (bits[:, None] >> shifts) & np.uint64(1) == 1
+
+def peg_counts(boards, table=MOVE_TABLE):
+    """Returns the number of pegs on each board."""
+    bits = np.ascontiguousarray(to_bits(boards, table))
+    unpacked = np.unpackbits(bits.view(np.uint8)).reshape(-1, 64)
+    return unpacked.sum(axis=1, dtype=np.int64)
+
+def legal_moves(boards, table=MOVE_TABLE):
+    """Returns a boolean matrix with one row per board and one column per
+    move in 'table', true where the move is legal."""
+    bits = to_bits(boards, table)[:, None]
+    jumpers = _masks(table.jumpers)
+    targets = _masks(table.targets)
+    return ((bits & jumpers) == jumpers) & ((bits & targets) == 0)
+
+def successors(boards, table=MOVE_TABLE):
+    """Makes every legal move on every board.
+
+    Returns '(parents, moves, children)': for each successor, the row of
+    its parent in 'boards', the index of the move made and the resulting
+    packed board.
+    """
+    bits = to_bits(boards, table)
+    parents, moves = np.nonzero(legal_moves(bits, table))
+    children = bits[parents] ^ _masks(table.flips)[moves]
+    return parents, moves, children
+
+def terminal_pegs(boards, table=MOVE_TABLE):
+    """Returns the peg count of each board that has no legal moves, and -1
+    for every other board."""
+    bits = to_bits(boards, table)
+    terminal = ~legal_moves(bits, table).any(axis=1)
+    return np.where(terminal, peg_counts(bits, table), -1)
+
+def expand_layers(starts=None, table=MOVE_TABLE):
+    """Yields the distinct positions reachable from 'starts', one layer
+    (number of moves made) at a time, as sorted uint64 arrays."""
+    if starts is None:
+        starts = [table.start]
+    layer = np.unique(to_bits(starts, table))
+    while layer.size:
+        yield layer
+        layer = np.unique(successors(layer, table)[2])
+
+def cross_check(boards, table=MOVE_TABLE):
+    """Compares 'legal_moves' against 'BaseGame.find_legal_moves' for every
+    board and returns the number of boards that disagree."""
+    bits = to_bits(boards, table)
+    legal = legal_moves(bits, table)
+    game = BaseGame(table.rows)
+    game()
+    mismatches = 0
+    for row, board in zip(legal, bits.tolist()):
+        game.board = table.to_board(board)
+        game.refresh_legal_moves()
+        expected = {table.move_index[(peg, move)] for peg, moves in
+                    game.find_legal_moves().items() for move in moves}
+        if expected != set(np.flatnonzero(row).tolist()):
+            mismatches += 1
+    return mismatches
@@ -0,0 +1 @@
+"""Benchmarks for the game engine and move path search."""
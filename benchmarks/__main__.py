@@ -0,0 +1,6 @@
+"""Runs the benchmark suite."""
+
+from tripeg.benchmarks.suite import main
+
+if __name__ == "__main__":
+    main()
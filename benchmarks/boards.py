@@ -0,0 +1,67 @@
+"""Measures solve times on boards with different numbers of rows.
+
+Run with 'python -m tripeg.benchmarks.boards [rows ...]'. Every starting
+hole of each board is solved from scratch with a transposition table
+bounded to 'MAXSIZE' positions. Symmetric starts are all timed, as the
+search visits their moves in a different order. The slowest start is
+then solved once more under 'tracemalloc' to record its peak memory.
+"""
+
+import sys
+import tracemalloc
+from time import perf_counter
+
+from tripeg.bitboard import MoveTable
+from tripeg.game import BaseGame
+from tripeg.movepaths import PathFinder
+from tripeg.symmetry import Symmetries
+
+MAXSIZE = 2000000
+
+def solve(rows, empty=None, maxsize=MAXSIZE):
+    """Solves a 'rows'-row board with the hole 'empty' (by default the
+    top one) empty and returns the path finder and elapsed time."""
+    game = BaseGame(rows, empty)
+    game()
+    # Builds the shared tables up front so they are not timed.
+    Symmetries.of(MoveTable.for_rows(rows))
+    path_finder = PathFinder(maxsize)
+    start = perf_counter()
+    path_finder(game)
+    return path_finder, perf_counter() - start
+
+def peak_memory(rows, empty, maxsize=MAXSIZE):
+    """Returns the peak memory in bytes allocated while solving the given
+    start."""
+    Symmetries.of(MoveTable.for_rows(rows))
+    tracemalloc.start()
+    try:
+        solve(rows, empty, maxsize)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main(sizes=(5, 6, 7, 8)):
+    """Runs benchmarks and prints results."""
+    print("{:>4}{:>7}{:>13}{:>9}{:>7}{:>11}{:>11}{:>11}{:>10}".format(
+        "rows", "holes", "default (s)", "worst", "score", "worst (s)",
+        "positions", "all (s)", "peak KiB"))
+    for rows in sizes:
+        default = solve(rows)[1]
+        worst = None
+        total = 0
+        for hole in MoveTable.for_rows(rows).holes:
+            path_finder, elapsed = solve(rows, hole)
+            total += elapsed
+            if worst is None or elapsed > worst[1]:
+                worst = (hole, elapsed, path_finder)
+        hole, elapsed, path_finder = worst
+        print("{:>4}{:>7}{:>13.3f}{:>9}{:>7}{:>11.3f}{:>11}{:>11.3f}"
+              "{:>10.0f}".format(rows, rows*(rows + 1)//2, default,
+                                 "{},{}".format(*hole),
+                                 path_finder.best_score, elapsed,
+                                 path_finder.cache_info().size, total,
+                                 peak_memory(rows, hole)/1024))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or (5, 6, 7, 8))
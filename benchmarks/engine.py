@@ -0,0 +1,88 @@
+"""Compares the dictionary-based 'BaseGame' against 'BitboardGame'.
+
+Run with 'python -m tripeg.benchmarks.engine'. Every row runs the same
+work on both engines. 'BaseGame' keeps its legal moves up to date as
+moves are made, so its 'find_legal_moves' only copies a dictionary and
+is faster than the drop-in 'BitboardGame.find_legal_moves', which scans
+the board every time; code that needs speed from the bitboard should
+use 'find_legal_indices' instead.
+"""
+
+from timeit import timeit
+from time import perf_counter
+
+from tripeg.game import BaseGame
+from tripeg.bitboard import BitboardGame
+
+OPENING = [((2,4),(2,4)), ((4,0),(-2,4)), ((7,2),(-4,0))]
+
+def _opened(game_class):
+    """Returns a started game of 'game_class' with 'OPENING' played."""
+    game = game_class()
+    game()
+    for move in OPENING:
+        game.move(*move)
+    return game
+
+def _dict_solve(game):
+    """Exhaustively searches 'game' through its public API only and
+    returns the lowest reachable peg count."""
+    legal_moves = game.find_legal_moves()
+    if not legal_moves:
+        return game.peg_count
+    best = None
+    for peg in legal_moves:
+        for move in legal_moves[peg]:
+            game.move(peg, move)
+            score = _dict_solve(game)
+            game.undo()
+            if best is None or score < best:
+                best = score
+    return best
+
+def _report(name, old, new, unit="us"):
+    """Prints timings for the old and new engines."""
+    scale = {"us": 1e6, "ms": 1e3}[unit]
+    print("{:<24}{:>10.2f}{:>3}{:>10.2f}{:>3}{:>10.2f}x".format(
+        name, old*scale, unit, new*scale, unit, old/new))
+
+def main(number=20000):
+    """Runs benchmarks and prints results."""
+    base = _opened(BaseGame)
+    bitboard = _opened(BitboardGame)
+    print("{:<24}{:>13}{:>13}{:>11}".format("", "dict", "bits", "speedup"))
+    old = timeit(base.find_legal_moves, number=number)/number
+    new = timeit(bitboard.find_legal_moves, number=number)/number
+    _report("find_legal_moves", old, new)
+    # 'BaseGame' keeps its legal moves up to date as moves are made, so
+    # the scan it does from scratch is timed against the bitmask scan.
+    old = timeit(base._scan_legal_moves, number=number)/number
+    new = timeit(bitboard.find_legal_indices, number=number)/number
+    _report("scan (dict vs indices)", old, new)
+    peg, move = OPENING[0]
+    base.undo()
+    bitboard.undo()
+    index = bitboard.table.move_index[(peg, move)]
+    def base_round_trip():
+        base.move(peg, move)
+        base.undo()
+    def bitboard_round_trip():
+        bitboard.play(index)
+        bitboard.undo()
+    old = timeit(base_round_trip, number=number)/number
+    new = timeit(bitboard_round_trip, number=number)/number
+    _report("move/undo", old, new)
+    # Both engines run the same unmemoized search through the public
+    # API, so the row compares the engines rather than the solvers.
+    base = _opened(BaseGame)
+    start = perf_counter()
+    _dict_solve(base)
+    old = perf_counter() - start
+    bitboard = _opened(BitboardGame)
+    start = perf_counter()
+    _dict_solve(bitboard)
+    new = perf_counter() - start
+    _report("full search (3 moves in)", old, new, "ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compares 'ParallelPathFinder' with the serial 'PathFinder'.
+
+Run with 'python -m tripeg.benchmarks.parallel [--workers N]'. Each
+start is solved from scratch by both, and their scores are checked
+against each other. The parallel times include starting the process
+pool, as every call does.
+"""
+
+import argparse
+import os
+from time import perf_counter
+
+from tripeg.bitboard import BitboardGame, MoveTable
+from tripeg.movepaths import ParallelPathFinder, PathFinder
+from tripeg.symmetry import Symmetries
+
+# '(rows, empty)' pairs, 'None' being the top hole. (8,4) is the slowest
+# start on seven rows.
+STARTS = ((5, None), (6, None), (7, None), (7, (8,4)))
+
+def _time(path_finder, rows, empty):
+    """Solves the start '(rows, empty)' with 'path_finder' and returns
+    '(score, seconds)'."""
+    game = BitboardGame(rows, empty)
+    game()
+    start = perf_counter()
+    path_finder(game)
+    return path_finder.best_score, perf_counter() - start
+
+def main(argv=None):
+    """Parses arguments, runs the comparison and prints results."""
+    parser = argparse.ArgumentParser(prog="python -m tripeg.benchmarks."
+                                     "parallel",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--split-depth", type=int, default=2)
+    args = parser.parse_args(argv)
+    print("{} worker(s), {} CPU(s)".format(args.workers, os.cpu_count()))
+    print("{:>4}{:>8}{:>7}{:>12}{:>14}{:>9}".format(
+        "rows", "empty", "score", "serial (s)", "parallel (s)", "speedup"))
+    for rows, empty in STARTS:
+        # Builds the shared tables up front so they are not timed.
+        Symmetries.of(MoveTable.for_rows(rows))
+        score, serial = _time(PathFinder(), rows, empty)
+        parallel_score, parallel = _time(ParallelPathFinder(
+            args.workers, args.split_depth), rows, empty)
+        if parallel_score != score:
+            raise AssertionError("scores differ on {} rows: {} and {}"
+                                 .format(rows, score, parallel_score))
+        print("{:>4}{:>8}{:>7}{:>12.3f}{:>14.3f}{:>8.2f}x".format(
+            rows, "top" if empty is None else "{},{}".format(*empty),
+            score, serial, parallel, serial/parallel))
+
+if __name__ == "__main__":
+    main()
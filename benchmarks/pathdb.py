@@ -0,0 +1,51 @@
+"""Compares opening lookups in the shelve 'paths' database against the
+memory-mapped 'PathDatabase'.
+
+Run with 'python -m tripeg.benchmarks.pathdb' after converting the
+database with 'python -m tripeg.pathdb'.
+"""
+
+import os
+import shelve
+from ast import literal_eval
+from timeit import timeit
+
+from tripeg.bitboard import MOVE_TABLE
+from tripeg.pathdb import FILENAME, SHELF, PathDatabase
+from tripeg.symmetry import Symmetries
+
+def _shelf_size():
+    """Returns the total size of the files that make up the shelf."""
+    return sum(os.path.getsize(SHELF + ext) for ext in (".dat", ".dir",
+                                                         ".bak") if
+               os.path.exists(SHELF + ext))
+
+def main(number=200):
+    """Runs benchmarks and prints results."""
+    with shelve.open(SHELF, "r") as db:
+        keys = list(db)
+    # The path database only holds canonical openings.
+    symmetries = Symmetries.of(MOVE_TABLE)
+    sequences = [symmetries.canonical_path(literal_eval(key))[0] for key in
+                 keys]
+    def shelf_lookups():
+        # Mirrors the old hint code, which opened the shelf every time.
+        for key in keys:
+            with shelve.open(SHELF, "r") as db:
+                db[key]
+    path_db = PathDatabase()
+    def path_db_lookups():
+        for moves in sequences:
+            path_db[moves]
+    old = timeit(shelf_lookups, number=number)/(number*len(keys))
+    new = timeit(path_db_lookups, number=number)/(number*len(keys))
+    path_db.close()
+    print("{:<16}{:>14}{:>14}".format("", "shelve", "tpdb"))
+    print("{:<16}{:>11.1f} us{:>11.1f} us  ({:.0f}x)".format(
+        "lookup", old*1e6, new*1e6, old/new))
+    print("{:<16}{:>8} bytes{:>8} bytes  ({:.0f}x)".format(
+        "file size", _shelf_size(), os.path.getsize(FILENAME),
+        _shelf_size()/os.path.getsize(FILENAME)))
+
+if __name__ == "__main__":
+    main()
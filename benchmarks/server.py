@@ -0,0 +1,122 @@
+"""Load test for the solver service.
+
+Run with 'python -m tripeg.benchmarks.server [--address ADDRESS]'.
+Without '--address', a 'SolverServer' is started in this process on a
+temporary Unix socket. Each of '--clients' connections then sends
+'--requests' requests one after another, for positions reached by
+random play, alternating best-move and ranked-move queries. Latency is
+measured per request, from sending it to reading its answer.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+from time import perf_counter
+
+from tripeg.bitboard import BitboardGame
+from tripeg.server import SolverServer, parse_address
+
+def _positions(count, rows, seed=0):
+    """Returns 'count' board bitmasks reached by random play."""
+    rng = random.Random(seed)
+    positions = []
+    for i in range(count):
+        game = BitboardGame(rows)
+        game()
+        for move_number in range(rng.randint(1, len(game.table.holes) - 3)):
+            legal_moves = game.find_legal_indices()
+            if len(legal_moves) < 2:
+                break
+            game.play(rng.choice(legal_moves))
+        positions.append(game.bits)
+    return positions
+
+async def _connect(address):
+    """Opens a connection to 'address'."""
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        return await asyncio.open_connection(*address)
+    return await asyncio.open_unix_connection(address)
+
+async def _client(address, positions, rows, latencies):
+    """Sends a request for every position in turn, recording each
+    latency in 'latencies'."""
+    reader, writer = await _connect(address)
+    for i, bits in enumerate(positions):
+        request = {"id": i, "op": ("best_move", "rank_moves")[i % 2],
+                   "rows": rows, "position": str(bits)}
+        start = perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(perf_counter() - start)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+    writer.close()
+    await writer.wait_closed()
+
+async def _stats(address):
+    """Returns the server's counters."""
+    reader, writer = await _connect(address)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return stats
+
+async def load_test(address, clients, requests, rows):
+    """Runs the load test against 'address' and returns the latencies
+    and the total time taken."""
+    positions = _positions(clients*requests, rows)
+    latencies = []
+    start = perf_counter()
+    await asyncio.gather(*[_client(address, positions[i::clients], rows,
+                                   latencies) for i in range(clients)])
+    return latencies, perf_counter() - start
+
+async def _run(args):
+    """Starts a server if needed, runs the load test and prints the
+    results."""
+    address = args.address
+    server = None
+    if address is None:
+        address = os.path.join(tempfile.mkdtemp(), "solver.sock")
+        solver = SolverServer()
+        server = asyncio.ensure_future(solver.serve(address))
+        while not os.path.exists(address):
+            await asyncio.sleep(0.01)
+    latencies, elapsed = await load_test(address, args.clients,
+                                         args.requests, args.rows)
+    latencies.sort()
+    stats = await _stats(address)
+    if server:
+        server.cancel()
+        await asyncio.wait([server])
+    print("{} requests from {} clients in {:.2f} s ({:.0f} requests/s)"
+          .format(len(latencies), args.clients, elapsed,
+                  len(latencies)/elapsed))
+    for name, fraction in (("p50", 0.5), ("p99", 0.99), ("max", 1)):
+        index = min(int(fraction*len(latencies)), len(latencies) - 1)
+        print("{:>4}: {:8.2f} ms".format(name, latencies[index]*1000))
+    print("server: {solved} solved in {batches} batches, {shared} shared "
+          "with a request already waiting".format(**stats))
+
+def main(argv=None):
+    """Parses arguments and runs the load test."""
+    parser = argparse.ArgumentParser(prog="python -m tripeg.benchmarks.server",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--address", help="server to test (default: start "
+                        "one on a temporary Unix socket)")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200,
+                        help="requests sent by each client")
+    parser.add_argument("--rows", type=int, default=5)
+    args = parser.parse_args(argv)
+    asyncio.run(_run(args))
+
+if __name__ == "__main__":
+    main()
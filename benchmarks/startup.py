@@ -0,0 +1,64 @@
+"""Measures what importing each part of the package costs a fresh
+interpreter.
+
+Run with 'python -m tripeg.benchmarks.startup'. Every module is imported
+once to write its bytecode cache, then 'REPEAT' more times, each in a
+new process. The fastest import is reported together with the number of
+modules it left loaded, whether it pulled in 'tkinter' and whether it
+changed the working directory.
+"""
+
+import os
+import subprocess
+import sys
+
+MODULES = ("tripeg", "tripeg.game", "tripeg.movepaths", "tripeg.solutions",
+           "tripeg.pathdb", "tripeg.solve", "tripeg.graphics")
+REPEAT = 10
+
+_PROBE = """\
+import os, sys, time
+cwd = os.getcwd()
+start = time.perf_counter()
+import {}
+elapsed = time.perf_counter() - start
+print(elapsed, len(sys.modules), "tkinter" in sys.modules, os.getcwd() != cwd)
+"""
+
+def _package_parent():
+    """Returns the directory that 'tripeg' is imported from."""
+    return os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+
+def measure(module):
+    """Returns '(seconds, modules, tkinter, chdir)' for importing
+    'module' in a fresh interpreter, keeping the fastest of 'REPEAT'
+    runs."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    best = None
+    for i in range(REPEAT + 1):
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(module)],
+                                cwd=_package_parent(), env=env,
+                                capture_output=True, text=True,
+                                check=True).stdout.split()
+        if not i:
+            continue
+        result = (float(output[0]), int(output[1]), output[2] == "True",
+                  output[3] == "True")
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+def main():
+    """Measures every module in 'MODULES' and prints the results."""
+    print("{:<20}{:>12}{:>10}{:>10}{:>8}".format("import", "ms", "modules",
+                                                "tkinter", "chdir"))
+    for module in MODULES:
+        seconds, modules, tkinter, chdir = measure(module)
+        print("{:<20}{:>12.2f}{:>10}{:>10}{:>8}".format(
+            module, seconds*1000, modules, "yes" if tkinter else "no",
+            "yes" if chdir else "no"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Reproducible benchmark suite for the engine, solver and hint lookups.
+
+Run with 'python -m tripeg.benchmarks [--output FILE] [--compare FILE]'.
+Every benchmark is timed on its own (best of 'REPEAT' runs), then run
+once more under 'tracemalloc' to record its peak memory. Results can be
+saved as JSON and compared against an earlier run to spot regressions.
+Nothing here needs a display.
+"""
+
+import argparse
+import json
+import platform
+import shelve
+import sys
+import tracemalloc
+from ast import literal_eval
+from functools import partial
+from time import perf_counter, strftime
+
+from tripeg.bitboard import MOVE_TABLE
+from tripeg.game import BaseGame, MainGame
+from tripeg.movepaths import DummyGame, PathFinder
+from tripeg.pathdb import SHELF, PathDatabase
+from tripeg.solutions import SolutionTable
+from tripeg.symmetry import Symmetries
+
+OPENING = [((2,4),(2,4)), ((4,0),(-2,4)), ((7,2),(-4,0)), ((0,0),(4,0)),
+           ((6,0),(-4,0)), ((1,2),(4,0))]
+DEPTHS = (0, 2, 4, 6)
+REPEAT = 5
+
+_BENCHMARKS = []
+
+def benchmark(name, number):
+    """Registers a benchmark.
+
+    The decorated function does any setup and returns the callable to
+    time. If that callable returns an integer, it is recorded as the
+    number of nodes searched.
+    """
+    def register(setup):
+        """Adds 'setup' to the suite and returns it unchanged."""
+        _BENCHMARKS.append((name, number, setup))
+        return setup
+    return register
+
+def _main_game(moves=()):
+    """Returns a started 'MainGame' with 'moves' played, without any
+    graphics."""
+    game = MainGame()
+    BaseGame.__call__(game)
+    for move in moves:
+        BaseGame.move(game, *move)
+    return game
+
+def _base_game(moves=()):
+    """Returns a started 'BaseGame' with 'moves' played."""
+    game = BaseGame()
+    game()
+    for move in moves:
+        game.move(*move)
+    return game
+
+@benchmark("BaseGame.find_legal_moves", 20000)
+def _find_legal_moves():
+    """Returns 'find_legal_moves' of a game three moves in."""
+    return _base_game(OPENING[:3]).find_legal_moves
+
+@benchmark("BaseGame move/undo", 20000)
+def _move_undo():
+    """Returns a function that makes and undoes the first opening move."""
+    game = _base_game()
+    def round_trip():
+        """Makes and undoes the first opening move."""
+        game.move(*OPENING[0])
+        game.undo()
+    return round_trip
+
+@benchmark("DummyGame from MainGame", 20000)
+def _dummy_game():
+    """Returns a function that converts a 'MainGame' into a
+    'DummyGame'."""
+    game = _main_game(OPENING[:3])
+    def convert():
+        """Converts the game into a 'DummyGame'."""
+        return DummyGame(game)
+    return convert
+
+def _solve(depth):
+    """Returns a function that solves the position 'depth' opening moves
+    in with a new 'PathFinder'."""
+    game = DummyGame(_main_game(OPENING[:depth]))
+    def solve():
+        """Solves the position and returns the number of positions
+        searched."""
+        path_finder = PathFinder()
+        path_finder(game)
+        return path_finder.table.misses
+    return solve
+
+for depth in DEPTHS:
+    benchmark("PathFinder solve, {} moves in".format(depth),
+              50)(partial(_solve, depth))
+
+@benchmark("PathFinder, every reachable position", 5)
+def _solve_all():
+    """Returns a function that solves every position reachable from the
+    start with one 'PathFinder'."""
+    table = DummyGame().table
+    games = []
+    layer = {table.start}
+    while layer:
+        for bits in sorted(layer):
+            game = DummyGame()
+            game.bits = bits
+            game.peg_count = bin(bits).count("1")
+            games.append(game)
+        layer = {bits ^ table.flips[index] for bits in layer for index in
+                 table.legal_moves(bits)}
+    def solve():
+        """Solves every position and returns the number of positions
+        searched."""
+        path_finder = PathFinder()
+        paths = []
+        for game in games:
+            path_finder(game)
+            paths.append(path_finder.path)
+        return path_finder.table.misses
+    return solve
+
+@benchmark("hint: shelve opening lookup", 200)
+def _shelve_lookup():
+    """Returns a function that opens the shelve database and reads one
+    opening, as the GUI used to for every hint."""
+    with shelve.open(SHELF, "r") as db:
+        key = next(iter(db))
+    def lookup():
+        """Reads one opening from the shelve database."""
+        with shelve.open(SHELF, "r") as db:
+            db[key]
+    return lookup
+
+@benchmark("hint: PathDatabase lookup", 20000)
+def _path_db_lookup():
+    """Returns a function that reads one opening from the
+    'PathDatabase'."""
+    path_db = PathDatabase()
+    with shelve.open(SHELF, "r") as db:
+        moves = literal_eval(next(iter(db)))
+    moves = Symmetries.of(MOVE_TABLE).canonical_path(moves)[0]
+    def lookup():
+        """Reads one opening from the 'PathDatabase'."""
+        return path_db[moves]
+    return lookup
+
+@benchmark("hint: SolutionTable lookup", 20000)
+def _solution_lookup():
+    """Returns a function that looks up the best moves four moves in."""
+    solutions = SolutionTable()
+    bits = DummyGame(_main_game(OPENING[:4])).bits
+    def lookup():
+        """Looks up the best moves in the 'SolutionTable'."""
+        return solutions.best_moves(bits)
+    return lookup
+
+def run(pattern=""):
+    """Runs every benchmark whose name contains 'pattern' and returns the
+    results as a list of dictionaries."""
+    results = []
+    for name, number, setup in _BENCHMARKS:
+        if pattern not in name:
+            continue
+        func = setup()
+        func()
+        elapsed = None
+        for repeat in range(REPEAT):
+            start = perf_counter()
+            for i in range(number):
+                nodes = func()
+            run_time = perf_counter() - start
+            if elapsed is None or run_time < elapsed:
+                elapsed = run_time
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result = {"name": name, "ops_per_sec": number/elapsed,
+                  "seconds_per_op": elapsed/number, "peak_bytes": peak}
+        if isinstance(nodes, int):
+            result["nodes"] = nodes
+        results.append(result)
+    return results
+
+def report(results, baseline=None):
+    """Prints 'results', with the speedup over 'baseline' if given."""
+    previous = {result["name"]: result for result in baseline or []}
+    print("{:<34}{:>14}{:>12}{:>9}{:>10}".format(
+        "benchmark", "ops/sec", "peak KiB", "nodes", "vs base"))
+    for result in results:
+        change = ""
+        if result["name"] in previous:
+            change = "{:.2f}x".format(result["ops_per_sec"]/previous[
+                result["name"]]["ops_per_sec"])
+        print("{:<34}{:>14.1f}{:>12.1f}{:>9}{:>10}".format(
+            result["name"], result["ops_per_sec"], result["peak_bytes"]/1024,
+            result.get("nodes", ""), change))
+
+def main(argv=None):
+    """Parses arguments, runs the suite and reports results."""
+    parser = argparse.ArgumentParser(prog="python -m tripeg.benchmarks",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="save results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier run")
+    parser.add_argument("--filter", default="",
+                        help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+    results = run(args.filter)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"time": strftime("%Y-%m-%dT%H:%M:%S"),
+                       "python": sys.version.split()[0],
+                       "platform": platform.platform(),
+                       "results": results}, file, indent=2)
@@ -0,0 +1,192 @@
+"""Provides a bitboard game engine in which the whole board is packed into a
+single integer."""
+
+from tripeg.game import BaseGame, make_board, make_moves
+
+class MoveTable:
+    """Precomputed bitmasks for every move that can be made on a board.
+
+    Holes are numbered in the order they appear in the board dictionary,
+    so hole 'i' corresponds to bit 'i' of a board integer. Moves are
+    numbered in the order they appear in the possible-moves dictionary.
+    Move indices are stored one per byte (see 'encode_moves'), so boards
+    with more than 'MAX_MOVES' moves, those with more than 10 rows, are
+    rejected with 'ValueError'.
+    """
+
+    MAX_MOVES = 256
+    _cache = {}
+
+    def __init__(self, board, possible_moves):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.rows = max(y for x, y in board)//2 + 1
+        self.holes = tuple(board)
+        self.hole_index = {hole: i for i, hole in enumerate(self.holes)}
+        self.full = (1 << len(self.holes)) - 1
+        self.start = self.to_bits(board)
+        self.moves = []
+        self.masks = []
+        for peg in self.holes:
+            for move in possible_moves[peg]:
+                midpoint = BaseGame._midpoint(peg, move)
+                endpoint = BaseGame._endpoint(peg, move)
+                masks = tuple(1 << self.hole_index[hole] for hole in
+                              (peg, midpoint, endpoint))
+                self.moves.append((peg, move))
+                self.masks.append(masks)
+        if len(self.moves) > __class__.MAX_MOVES:
+            raise ValueError("a {}-row board has {} moves, but at most {} "
+                             "are supported".format(self.rows,
+                                                    len(self.moves),
+                                                    __class__.MAX_MOVES))
+        self.moves = tuple(self.moves)
+        self.masks = tuple(self.masks)
+        self.move_index = {move: i for i, move in enumerate(self.moves)}
+        # 'jumpers' must be full and 'targets' empty for a move to be legal;
+        # 'flips' are XORed into the board to make or undo the move.
+        self.jumpers = tuple(frm | over for frm, over, to in self.masks)
+        self.targets = tuple(to for frm, over, to in self.masks)
+        self.flips = tuple(frm | over | to for frm, over, to in self.masks)
+        self._checks = tuple(zip(range(len(self.moves)), self.jumpers,
+                                 self.targets))
+        # Three-colouring in which every line of three holes has one hole
+        # of each colour. Every move flips the parity of all three colour
+        # counts, so those parities bound how few pegs can be left.
+        self.colors = [0, 0, 0]
+        for i, (x, y) in enumerate(self.holes):
+            row = y//2
+            self.colors[(row - (x - row)//2) % 3] |= 1 << i
+        self.colors = tuple(self.colors)
+
+    @classmethod
+    def for_rows(cls, rows):
+        """Returns the (shared) move table for a board with 'rows' rows.
+
+        'start' is the position with the top hole empty.
+        """
+        try:
+            return cls._cache[rows]
+        except KeyError:
+            table = cls._cache[rows] = cls(make_board(rows), make_moves(rows))
+            return table
+
+    def to_bits(self, board):
+        """Packs a board dictionary into an integer."""
+        bits = 0
+        for hole, filled in board.items():
+            if filled:
+                bits |= 1 << self.hole_index[hole]
+        return bits
+
+    def to_board(self, bits):
+        """Unpacks an integer into a board dictionary."""
+        return {hole: (bits >> i) & 1 for i, hole in enumerate(self.holes)}
+
+    def encode_moves(self, moves):
+        """Packs a sequence of '(peg, move)' pairs into bytes, one move
+        index per byte."""
+        return bytes(self.move_index[move] for move in moves)
+
+    def decode_moves(self, indices):
+        """Unpacks move indices, such as bytes from 'encode_moves', into
+        a list of '(peg, move)' pairs."""
+        moves = self.moves
+        return [moves[index] for index in indices]
+
+    def legal_moves(self, bits):
+        """Returns the indices of all moves that are legal on 'bits'."""
+        return [i for i, jumpers, target in self._checks if
+                bits & jumpers == jumpers and not bits & target]
+
+    def min_pegs(self, bits):
+        """Returns a lower bound on the number of pegs that can be left
+        at the end of a game played from 'bits'."""
+        parities = {bin(bits & color).count("1") % 2 for color in
+                    self.colors}
+        return 2 if len(parities) == 1 else 1
+
+    def is_legal(self, bits, index):
+        """Determines if the move at 'index' is legal on 'bits'."""
+        jumpers = self.jumpers[index]
+        return bits & jumpers == jumpers and not bits & self.targets[index]
+
+MOVE_TABLE = MoveTable.for_rows(5)
+
+class BitboardGame(BaseGame):
+    """Drop-in alternative to 'BaseGame' that stores the board as an
+    integer.
+
+    'board' is still available as a dictionary, but it is rebuilt on
+    every access, so code that needs speed should use 'bits',
+    'find_legal_indices' and 'play' instead. The same goes for 'moves',
+    which is decoded from the move indices in '_played'.
+    """
+
+    table = MOVE_TABLE
+
+    def __init__(self, rows=5, empty=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        super().__init__(rows, empty)
+        self.table = MoveTable.for_rows(rows)
+        self.start = self.table.start
+        if empty is not None:
+            self.start = self.table.full ^ 1 << self.table.hole_index[empty]
+
+    def __call__(self):
+        """Call self as function."""
+        self.started = True
+        self.bits = self.start
+        self.peg_count = self._start_pegs
+        self._played = bytearray()
+
+    @property
+    def board(self):
+        """The board as a dictionary of holes."""
+        return self.table.to_board(self.bits)
+
+    @board.setter
+    def board(self, board):
+        self.bits = self.table.to_bits(board)
+
+    @property
+    def moves(self):
+        """The moves made so far as '(peg, move)' pairs."""
+        return self.table.decode_moves(self._played)
+
+    def find_legal_indices(self):
+        """Finds the indices of all moves that are currently legal."""
+        return self.table.legal_moves(self.bits)
+
+    def find_legal_moves(self):
+        """Finds all moves that are currently legal.
+
+        Returns a dictionary in the same format as
+        'BaseGame.find_legal_moves'.
+        """
+        legal_moves = {}
+        for index in self.table.legal_moves(self.bits):
+            peg, move = self.table.moves[index]
+            legal_moves.setdefault(peg, []).append(move)
+        return legal_moves
+
+    def play(self, index):
+        """Makes the move at 'index' in the move table."""
+        self.bits ^= self.table.flips[index]
+        self.peg_count -= 1
+        self._played.append(index)
+
+    def move(self, peg, move):
+        """Makes a move."""
+        self.play(self.table.move_index[(peg, move)])
+
+    def undo(self):
+        """Undoes a move."""
+        index = self._played.pop()
+        self.bits ^= self.table.flips[index]
+        self.peg_count += 1
+
+    def restart(self):
+        """Restarts the game."""
+        self.bits = self.start
+        self.peg_count = self._start_pegs
+        self._played.clear()
@@ -2,35 +2,121 @@
 
 from operator import add
 
+_JUMPS = ((-4,0),(4,0),(2,4),(-2,4),(-2,-4),(2,-4))
+
+def make_board(rows=5, empty=None):
+    """Generates the board dictionary for a triangle with 'rows' rows.
+
+    Row 'r' (counted from the bottom) has its holes at 'y == 2*r' and at
+    every other 'x' starting from 'r'. 'empty' is the hole that starts
+    without a peg and defaults to the top of the triangle.
+    """
+    if empty is None:
+        empty = (rows - 1, 2*(rows - 1))
+    board = {}
+    for row in range(rows):
+        for pos in range(rows - row):
+            board[(row + 2*pos, 2*row)] = 1
+    if empty not in board:
+        raise ValueError("{} is not a hole on a {}-row board".format(empty,
+                                                                    rows))
+    board[empty] = 0
+    return board
+
+def make_moves(rows=5):
+    """Generates the movement vectors available from every hole of a
+    triangle with 'rows' rows."""
+    holes = make_board(rows)
+    possible_moves = {}
+    for peg in holes:
+        possible_moves[peg] = tuple(move for move in _JUMPS if
+                                    tuple(map(add, peg, move)) in holes)
+    return possible_moves
+
+_BOARD_TABLES = {}
+
+def _board_tables(rows, empty):
+    """Returns cached '(board, possible_moves)' tables for a 'rows'-row
+    board that starts with 'empty' empty. Neither may be modified."""
+    try:
+        return _BOARD_TABLES[(rows, empty)]
+    except KeyError:
+        pass
+    tables = _BOARD_TABLES[(rows, empty)] = (make_board(rows, empty),
+                                             make_moves(rows))
+    return tables
+
+_JUMP_TABLES = {}
+
+def _jump_tables(rows):
+    """Returns the cached table of moves affected by each move on a
+    'rows'-row board.
+
+    It maps every '(peg, move)' to '(midpoint, endpoint, made, undone)',
+    where 'made' and 'undone' describe making and undoing the move. Each
+    is a pair holding the moves through the three holes it changes: the
+    '(peg, move)' pairs those changes make illegal and the '(peg, move,
+    midpoint, endpoint)' tuples they may make legal.
+    """
+    try:
+        return _JUMP_TABLES[rows]
+    except KeyError:
+        pass
+    jumps = {}
+    for peg, moves in make_moves(rows).items():
+        jumps[peg] = tuple((move, BaseGame._midpoint(peg, move),
+                            BaseGame._endpoint(peg, move)) for move in moves)
+    affected = {}
+    for peg in jumps:
+        for move, midpoint, endpoint in jumps[peg]:
+            tables = []
+            # Holes a move empties and fills; undoing it swaps them.
+            for emptied, filled in (((peg, midpoint), (endpoint,)),
+                                    ((endpoint,), (peg, midpoint))):
+                lost = []
+                gained = []
+                for other in jumps:
+                    for other_move, other_mid, other_end in jumps[other]:
+                        needs_peg = {other, other_mid}
+                        holes = needs_peg | {other_end}
+                        if not holes & {peg, midpoint, endpoint}:
+                            continue
+                        if needs_peg & set(emptied) or other_end in filled:
+                            lost.append((other, other_move))
+                        else:
+                            gained.append((other, other_move, other_mid,
+                                           other_end))
+                tables.append((tuple(lost), tuple(gained)))
+            affected[(peg, move)] = (midpoint, endpoint) + tuple(tables)
+    _JUMP_TABLES[rows] = affected
+    return affected
+
 class BaseGame:
-    """Base class for all game classes."""
-
-    _ORIGINAL_BOARD = {(0,0): 1, (2,0): 1, (4,0): 1, (6,0): 1, (8,0): 1,
-                       (1,2): 1, (3,2): 1, (5,2): 1, (7,2): 1, (2,4): 1,
-		       (4,4): 1, (6,4): 1, (3,6): 1, (5,6): 1, (4,8): 0}
-    _POSSIBLE_MOVES = {(0,0): ((4,0),(2,4)),
-                       (2,0): ((4,0),(2,4)),
-                       (4,0): ((-4,0),(4,0),(2,4),(-2,4)),
-                       (6,0): ((-4,0),(-2,4)),
-                       (8,0): ((-4,0),(-2,4)),
-                       (1,2): ((4,0),(2,4)),
-                       (3,2): ((4,0),(2,4)),
-                       (5,2): ((-4,0),(-2,4)),
-                       (7,2): ((-4,0),(-2,4)),
-                       (2,4): ((4,0),(2,4),(-2,-4),(2,-4)),
-                       (4,4): ((-2,-4,),(2,-4)),
-                       (6,4): ((-4,0),(-2,4),(-2,-4),(2,-4)),
-                       (3,6): ((-2,-4),(2,-4)),
-                       (5,6): ((-2,-4),(2,-4)),
-                       (4,8): ((-2,-4),(2,-4))}
+    """Base class for all game classes.
+
+    Legal moves are tracked incrementally: each move or undo only
+    updates the moves that pass through the three holes it changed.
+    Code that assigns 'board' directly must call
+    'refresh_legal_moves' afterwards.
+    """
+
     started = False
 
+    def __init__(self, rows=5, empty=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.rows = rows
+        self.empty = empty
+        board, self._possible_moves = _board_tables(rows, empty)
+        self._original_board = board.copy()
+        self._start_pegs = len(board) - 1
+
     def __call__(self):
         """Call self as function."""
         self.started = True
-        self.board = __class__._ORIGINAL_BOARD.copy()
-        self.peg_count = 14
+        self.board = self._original_board.copy()
+        self.peg_count = self._start_pegs
         self.moves = []
+        self.refresh_legal_moves()
 
     @staticmethod
     def _endpoint(peg, move):
@@ -62,43 +148,125 @@ class BaseGame:
 
         Returns a dictionary whose keys are the locations of holes with
         pegs in them and whose values are movement vectors that the pegs
-        can legally move along.
+        can legally move along. The dictionary is a snapshot; the lists
+        in it are never modified afterwards.
         """
+        return self._legal_moves.copy()
+
+    def _scan_legal_moves(self):
+        """Finds all legal moves by checking every peg on the board."""
         pegs = [peg for peg in self.board if self.board[peg]]
         legal_moves = {}
         for peg in pegs:
             peg_moves = []
-            for move in __class__._POSSIBLE_MOVES[peg]:
+            for move in self._possible_moves[peg]:
                 if self._is_legal(peg, move):
                     peg_moves.append(move)
             if len(peg_moves):
                 legal_moves[peg] = peg_moves
         return legal_moves
 
+    def refresh_legal_moves(self):
+        """Rebuilds the legal-move set from scratch."""
+        self._affected = _jump_tables(self.rows)
+        self._legal_moves = self._scan_legal_moves()
+
+    def _update_legal_moves(self, lost, gained):
+        """Removes the moves in 'lost' that were legal and adds those in
+        'gained' that now are (see '_jump_tables').
+
+        Move lists are replaced rather than modified, so snapshots
+        returned by 'find_legal_moves' stay valid.
+        """
+        board = self.board
+        legal_moves = self._legal_moves
+        for peg, move in lost:
+            peg_moves = legal_moves.get(peg)
+            if peg_moves and move in peg_moves:
+                if len(peg_moves) == 1:
+                    del legal_moves[peg]
+                else:
+                    legal_moves[peg] = [other for other in peg_moves if
+                                        other != move]
+        for peg, move, midpoint, endpoint in gained:
+            if board[peg] and board[midpoint] and not board[endpoint]:
+                legal_moves[peg] = legal_moves.get(peg, []) + [move]
+
     def move(self, peg, move):
         """Makes a move."""
-        self.board[peg] = 0
-        self.board[self._midpoint(peg, move)] = 0
-        self.board[self._endpoint(peg, move)] = 1
+        midpoint, endpoint, made, undone = self._affected[(peg, move)]
+        board = self.board
+        board[peg] = 0
+        board[midpoint] = 0
+        board[endpoint] = 1
         self.peg_count -= 1
         self.moves.append((peg, move))
+        self._update_legal_moves(*made)
 
     def undo(self):
         """Undoes a move."""
         peg, move = self.moves.pop()
-        self.board[peg] = 1
-        self.board[self._midpoint(peg, move)] = 1
-        self.board[self._endpoint(peg, move)] = 0
+        midpoint, endpoint, made, undone = self._affected[(peg, move)]
+        board = self.board
+        board[peg] = 1
+        board[midpoint] = 1
+        board[endpoint] = 0
         self.peg_count += 1
+        self._update_legal_moves(*undone)
 
     def restart(self):
         """Restarts the game."""
-        self.board = __class__._ORIGINAL_BOARD.copy()
-        self.peg_count = 14
+        self.board = self._original_board.copy()
+        self.peg_count = self._start_pegs
         self.moves.clear()
+        self.refresh_legal_moves()
+
+def check_incremental(rows=5, games=100, rng=None):
+    """Plays 'games' random games on a 'rows'-row board, mixing in undos
+    and restarts, and compares the legal moves 'BaseGame' tracks
+    incrementally against a full rescan after every step. Returns the
+    number of steps that disagree.
+
+    'rng' defaults to the 'random' module.
+    """
+    if rng is None:
+        # Imported here so that importing the game stays cheap.
+        import random as rng
+    holes = list(make_board(rows))
+    mismatches = 0
+    for i in range(games):
+        game = BaseGame(rows, rng.choice(holes))
+        game()
+        for step in range(2*len(holes)):
+            legal_moves = game.find_legal_moves()
+            action = rng.random()
+            if game.moves and (not legal_moves or action < 0.2):
+                game.undo()
+            elif game.moves and action < 0.25:
+                game.restart()
+            elif legal_moves:
+                peg = rng.choice(list(legal_moves))
+                game.move(peg, rng.choice(legal_moves[peg]))
+            # Moves may be listed in a different order than a scan
+            # finds them.
+            tracked = {peg: set(moves) for peg, moves in
+                       game.find_legal_moves().items()}
+            if tracked != {peg: set(moves) for peg, moves in
+                           game._scan_legal_moves().items()}:
+                mismatches += 1
+    return mismatches
 
 class MainGame(BaseGame):
-    """Main game class."""
+    """Main game class.
+
+    If 'log' is given (see 'GameLog'), every game played is recorded in
+    it when the game is restarted or the window is closed.
+    """
+
+    def __init__(self, rows=5, empty=None, log=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        super().__init__(rows, empty)
+        self.log = log
 
     def __call__(self, graphics):
         """Call self as function."""
@@ -108,6 +276,8 @@ class MainGame(BaseGame):
         self.graphics.construct()
         self.graphics.update_peg_moves()
         self.graphics.window.mainloop()
+        if self.log:
+            self.log.record(self)
 
     def move(self, peg, move):
         """Makes a move."""
@@ -125,6 +295,8 @@ class MainGame(BaseGame):
 
     def restart(self):
         """Restarts the game."""
+        if self.log:
+            self.log.record(self)
         super().restart()
         self.graphics.reset_()
         self.graphics.update_peg_moves()
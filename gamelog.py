@@ -0,0 +1,100 @@
+"""Records played games to a compact, append-only log file.
+
+The file starts with a short header and then holds one record per game:
+
+    rows        number of rows on the board
+    empty       index of the starting empty hole in 'MoveTable.holes'
+    length      number of moves made
+    moves       'length' move indices into 'MoveTable.moves'
+
+every field being one byte, so a finished game on the standard board
+takes 16 bytes. A record cut short by a crash is ignored when reading.
+The GUI's log lives in a per-user state directory ('FILENAME'), never
+inside the package. Analyze a log with 'python -m tripeg.analyze'.
+"""
+
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from tripeg.bitboard import MoveTable
+
+def _state_dir():
+    """Returns the per-user directory that the GUI's log is kept in."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "tripeg")
+
+FILENAME = os.path.join(_state_dir(), "games.tplog")
+
+RecordedGame = namedtuple("RecordedGame", ["rows", "empty", "moves"])
+
+class GameLog:
+    """Appends games to, and reads games back from, the log 'filename'.
+
+    'moves' in each 'RecordedGame' read back are move indices into the
+    'MoveTable' for its board, and 'empty' is the starting empty hole.
+    """
+
+    MAGIC = b"TPGL"
+    VERSION = 1
+    _HEADER = struct.Struct("<4sB")
+    _RECORD = struct.Struct("<BBB")
+
+    def __init__(self, filename=FILENAME):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.filename = filename
+
+    def record(self, game):
+        """Appends the moves made so far in 'game', if any.
+
+        Returns False, after reporting why on standard error, if the game
+        cannot be recorded, so that a read-only install or a board too
+        large for the log format never stops the game itself.
+        """
+        if not game.moves:
+            return True
+        try:
+            table = MoveTable.for_rows(game.rows)
+            empty = next(hole for hole, filled in
+                         game._original_board.items() if not filled)
+            moves = table.encode_moves(game.moves)
+            directory = os.path.dirname(self.filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.filename, "ab") as file:
+                if not file.tell():
+                    file.write(__class__._HEADER.pack(__class__.MAGIC,
+                                                      __class__.VERSION))
+                file.write(__class__._RECORD.pack(game.rows,
+                                                  table.hole_index[empty],
+                                                  len(moves)) + moves)
+        except (OSError, ValueError) as error:
+            print("Could not record the game: {}".format(error),
+                  file=sys.stderr)
+            return False
+        return True
+
+    def __iter__(self):
+        """Implement iter(self)."""
+        with open(self.filename, "rb") as file:
+            header = file.read(__class__._HEADER.size)
+            if (len(header) != __class__._HEADER.size or
+                __class__._HEADER.unpack(header) != (__class__.MAGIC,
+                                                     __class__.VERSION)):
+                raise ValueError("{} is not a game log".format(
+                    self.filename))
+            while True:
+                record = file.read(__class__._RECORD.size)
+                if len(record) != __class__._RECORD.size:
+                    return
+                rows, empty, length = __class__._RECORD.unpack(record)
+                moves = file.read(length)
+                if len(moves) != length:
+                    return
+                table = MoveTable.for_rows(rows)
+                yield RecordedGame(rows, table.holes[empty], tuple(moves))
@@ -1,13 +1,22 @@
 """GUI and graphics for game."""
 
-import shelve
+import os
+import sys
 from tkinter import *
 from tkinter import ttk
-from turtle import TurtleScreen, RawPen, _CFG
+from turtle import TurtleScreen, RawPen, _CFG, config_dict
 from operator import add, sub
+from queue import Empty, Queue
 from random import choice
+from threading import Thread
 
-from tripeg.movepaths import PathFinder
+from tripeg import DATA_DIR
+from tripeg.bitboard import MOVE_TABLE
+from tripeg.movepaths import (AnytimePathFinder, DummyGame, PathFinder,
+                              SearchCancelled)
+from tripeg.pathdb import PathDatabase
+from tripeg.solutions import SolutionTable
+from tripeg.symmetry import Symmetries
 from tripeg.animations import Arrow
 
 class Peg(RawPen):
@@ -24,6 +33,7 @@ class Peg(RawPen):
         self.pen(pendown=False, speed=0, outline=2, fillcolor="red",
                  pencolor="black", stretchfactor=(1.25,1.25))
         self.start_point = start_point
+        self.home_point = start_point
         self.goto(start_point)
         self.ondrag(self._remove)
         self.onrelease(self._place)
@@ -90,12 +100,42 @@ class BasicGUI:
         self.best_move_btn.grid(row=2, column=1)
 
 class TurtleGraphics(BasicGUI):
-    """GUI with graphics created using 'turtle'."""
+    """GUI with graphics created using 'turtle'.
+
+    Hints are searched for by 'path_finder', which defaults to an
+    in-process 'AnytimePathFinder'; a 'SolverClient' can be passed in
+    to use a shared solver service instead. If the service fails, the
+    rest of the session falls back to an in-process search.
+    """
 
     _WORLD_COORDS = (-2,-2,10,10)
     _PEG_OFFSET = (0,0.4)
     HADES = (0,12)
+    POLL_INTERVAL = 20
+    # Seconds a background search may take before settling for the best
+    # path found so far. The best move and the move scores each get
+    # this long.
+    SEARCH_TIME_LIMIT = 0.05
+    # Arrow colours for moves that keep the best result, lose one peg on
+    # it, and lose more.
+    RANK_COLORS = ("green", "gold", "red")
     best_move = None
+    move_scores = None
+    path_finder = None
+    solutions = None
+    path_db = None
+    _worker = None
+    _frozen = False
+
+    def __init__(self, path_finder=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        if path_finder is not None:
+            if not (hasattr(path_finder, "cancel") and
+                    hasattr(path_finder, "cancelled")):
+                raise TypeError("path_finder must be cancellable, like a "
+                                "CancellablePathFinder or SolverClient")
+            self.path_finder = path_finder
+        super().__init__()
 
     @classmethod
     def _add_offset(cls, position):
@@ -150,7 +190,8 @@ class TurtleGraphics(BasicGUI):
             if self.game.board[peg_hole]:
                 start_point = __class__._add_offset(peg_hole)
                 peg = Peg(start_point, self)
-                self.peg_dir.append(peg)
+                self.peg_dir[peg_hole] = peg
+        self.home_dir = self.peg_dir.copy()
 
     def _add_callbacks(self):
         """Adds callbacks to buttons."""
@@ -159,32 +200,134 @@ class TurtleGraphics(BasicGUI):
         self.show_moves_btn["command"] = self.show_legal_moves
         self.best_move_btn["command"] = self.show_best_move
 
-    def _find_best_move(self):
-        """Finds best move possible for current game."""
-        if len(self.game.moves) <= 3:
-            with shelve.open("paths") as db:
-                best_paths = db[str(self.game.moves)]
-                best_path = choice(best_paths)
-        else:
-            self.path_finder(self.game)
+    def _find_best_move(self, game):
+        """Finds best move possible for 'game', a 'DummyGame' snapshot of
+        the current game.
+
+        Runs on the search worker thread, so it must not touch Tk.
+        """
+        if self.solutions and self.solutions.best_score(game.bits):
+            best_move = choice(self.solutions.best_moves(game.bits))
+            return (__class__._add_offset(best_move[0]), best_move[1])
+        # The opening database only covers the default starting hole.
+        best_path = None
+        if (self.path_db is not None and len(game.moves) <= 3 and
+            game.start == MOVE_TABLE.start):
+            symmetries = Symmetries.of(MOVE_TABLE)
+            moves, transform = symmetries.canonical_path(game.moves)
+            if moves in self.path_db:
+                best_path = symmetries.restore_path(
+                    choice(self.path_db[moves]), transform)
+        if best_path is None:
+            self.path_finder(game)
             best_path = self.path_finder.best_path
-        best_move = best_path[len(self.game.moves)]
+        best_move = best_path[len(game.moves)]
         best_move = (__class__._add_offset(best_move[0]), best_move[1])
         return best_move
 
+    def _score_moves(self, game):
+        """Returns a dictionary mapping every legal move in 'game' to the
+        lowest peg count reachable after it.
+
+        Runs on the search worker thread, so it must not touch Tk.
+        """
+        if self.solutions and self.solutions.best_score(game.bits):
+            table = game.table
+            return {table.moves[index]: self.solutions.best_score(
+                game.bits ^ table.flips[index]) for index in
+                table.legal_moves(game.bits)}
+        return {move: score for score, move in
+                self.path_finder.rank_moves(game)}
+
+    def _search_worker(self):
+        """Answers best-move requests in the background, forever.
+
+        The best move is posted as soon as it is found and the move
+        scores follow in a second result, so ranking the moves never
+        delays the hint.
+        """
+        while True:
+            search_id, game = self._requests.get()
+            self.path_finder.cancelled.clear()
+            if search_id != self._search_id:
+                continue
+            best_move = move_scores = None
+            try:
+                best_move = self._ask(self._find_best_move, game)
+                self._results.put((search_id, best_move, None, False))
+                move_scores = self._ask(self._score_moves, game)
+            except SearchCancelled:
+                continue
+            except Exception as error:
+                # Reported rather than raised, so that one failed search
+                # cannot stop the worker and leave hints disabled.
+                print("Could not find a hint: {!r}".format(error),
+                      file=sys.stderr)
+            self._results.put((search_id, best_move, move_scores, True))
+
+    def _ask(self, find, game):
+        """Returns 'find(game)'. If 'path_finder' is a solver service
+        that fails, it is replaced with an in-process search first."""
+        try:
+            return find(game)
+        except (OSError, ValueError) as error:
+            if isinstance(self.path_finder, PathFinder):
+                raise
+            print("Solver service failed ({}); searching locally "
+                  "instead.".format(error), file=sys.stderr)
+            self.path_finder = AnytimePathFinder(
+                time_limit=__class__.SEARCH_TIME_LIMIT)
+            return find(game)
+
+    def _request_best_move(self):
+        """Cancels any running search and, if the game is in progress,
+        starts a new one for the current position."""
+        self._search_id += 1
+        self.path_finder.cancel()
+        self.best_move = None
+        self.move_scores = None
+        if self.game.moves and self.game.find_legal_moves():
+            self._requests.put((self._search_id, DummyGame(self.game)))
+            self.root.after(__class__.POLL_INTERVAL, self._poll_best_move,
+                            self._search_id)
+
+    def _poll_best_move(self, search_id):
+        """Collects the results of search 'search_id' as they arrive,
+        until the last one is in."""
+        if search_id != self._search_id:
+            return
+        received = finished = False
+        try:
+            while not finished:
+                result_id, best_move, move_scores, finished = (
+                    self._results.get_nowait())
+                if result_id != search_id:
+                    finished = False
+                    continue
+                self.best_move = best_move
+                self.move_scores = move_scores
+                received = True
+        except Empty:
+            self.root.after(__class__.POLL_INTERVAL, self._poll_best_move,
+                            search_id)
+        if received and not self._frozen:
+            self.update_gui()
+
     def _disable_all(self):
         """Disables all buttons and pegs."""
         self.undo_btn["state"] = "disabled"
         self.restart_btn["state"] = "disabled"
         self.show_moves_btn["state"] = "disabled"
         self.best_move_btn["state"] = "disabled"
-        for peg in self.peg_dir:
+        self._frozen = True
+        for peg in self.peg_dir.values():
             peg.moveable = False
 
     def _restore_all(self):
         """Enables pegs and buttons that would normally be enabled."""
+        self._frozen = False
         self.update_gui()
-        for peg in self.peg_dir:
+        for peg in self.peg_dir.values():
             peg.moveable = True
 
     def _delayed_callback(self, arrows):
@@ -195,52 +338,77 @@ class TurtleGraphics(BasicGUI):
         
     def construct(self):
         """Constructs graphics."""
+        _CFG.update(config_dict(os.path.join(DATA_DIR, "turtle.cfg")))
         self.window = TurtleScreen(self.canvas)
         self.window.setworldcoordinates(*__class__._WORLD_COORDS)
         self.window.bgcolor(102,51,0)
-        self.peg_dir = []
+        # 'peg_dir' maps board holes to the pegs now in them and
+        # 'home_dir' maps them to the pegs they started with.
+        self.peg_dir = {}
         self.arrow_dir = []
         self.graveyard = []
-        self.path_finder = PathFinder()
+        if self._worker is None:
+            if self.path_finder is None:
+                self.path_finder = AnytimePathFinder(
+                    time_limit=__class__.SEARCH_TIME_LIMIT)
+            self._search_id = 0
+            self._requests = Queue()
+            self._results = Queue()
+            self._worker = Thread(target=self._search_worker, daemon=True)
+            self._worker.start()
+        if not self.solutions:
+            try:
+                self.solutions = SolutionTable()
+            except (OSError, ValueError):
+                pass
+        if self.path_db is None:
+            try:
+                self.path_db = PathDatabase()
+            except (OSError, ValueError):
+                pass
         self._draw_board()
         self._place_pegs()
         self._add_callbacks()
 
     def update_(self, peg, move):
         """Updates the graphics when a move is made."""
-        midpoint = __class__._add_offset(self.game._midpoint(peg, move))
-        lower_bound = (midpoint[0], midpoint[1]-0.01)
-        upper_bound = (midpoint[0], midpoint[1]+0.01)
-        dead_peg = [peg for peg in self.peg_dir if peg.pos() > lower_bound and
-                    peg.pos() < upper_bound][0]
+        midpoint = self.game._midpoint(peg, move)
+        endpoint = self.game._endpoint(peg, move)
+        dead_peg = self.peg_dir.pop(midpoint)
         dead_peg.goto(__class__.HADES)
-        self.peg_dir.remove(dead_peg)
         self.graveyard.append(dead_peg)
+        self.peg_dir[endpoint] = self.peg_dir.pop(peg)
 
     def erase(self):
         """Updates the graphics when a move is undone."""
-        last_peg_pos = __class__._add_offset(tuple(map(
-            add, *self.game.moves[-1])))
-        last_peg = [peg for peg in self.peg_dir if abs(peg.pos()-last_peg_pos)
-                    < 0.1][0]
-        last_peg.goto(__class__._add_offset(self.game.moves[-1][0]))
+        peg, move = self.game.moves[-1]
+        last_peg = self.peg_dir.pop(self.game._endpoint(peg, move))
+        last_peg.goto(__class__._add_offset(peg))
         last_peg.start_point = last_peg.pos()
+        self.peg_dir[peg] = last_peg
         revived_peg = self.graveyard.pop()
         revived_peg.goto(revived_peg.start_point)
-        self.peg_dir.append(revived_peg)
-        
+        self.peg_dir[self.game._midpoint(peg, move)] = revived_peg
+
     def reset_(self):
-        """Updates the graphics when the game is restarted."""
-        for obj in [self.window, self.peg_dir, self.arrow_dir, self.graveyard]:
-            del obj
-        self.canvas.destroy()
-        self.canvas = Canvas(self.mainframe, width=500, height=500,
-                             relief="sunken", borderwidth=3)
-        self.canvas.grid(row=1, column=1, sticky=(N,S,E,W))
-        self.construct()
-         
+        """Updates the graphics when the game is restarted.
+
+        Pegs are sent back to the holes they started in rather than
+        redrawing the board.
+        """
+        for arrow in self.arrow_dir:
+            arrow.banish()
+        self.graveyard.clear()
+        self.peg_dir = self.home_dir.copy()
+        for peg in self.peg_dir.values():
+            peg.goto(peg.home_point)
+            peg.start_point = peg.home_point
+            peg.moveable = True
+
     def show_legal_moves(self):
-        """Shows the player all legal moves."""
+        """Shows the player all legal moves, coloured by the best result
+        each one still allows once the background search has ranked
+        them."""
         self._disable_all()
         move_count = 0
         legal_moves = self.game.find_legal_moves()
@@ -252,12 +420,18 @@ class TurtleGraphics(BasicGUI):
             self.arrow_dir.append(Arrow(self))
         used_arrows = []
         arrow_count = 0
+        if self.move_scores:
+            best_score = min(self.move_scores.values())
         for start_peg in legal_moves:
             for move in legal_moves[start_peg]:
                 arrow = self.arrow_dir[arrow_count]
                 origin = __class__._add_offset(start_peg)
                 destination = tuple(map(add, origin, move))
-                arrow.draw(origin, destination)
+                color = __class__.RANK_COLORS[0]
+                if self.move_scores:
+                    rank = self.move_scores[(start_peg, move)] - best_score
+                    color = __class__.RANK_COLORS[min(rank, 2)]
+                arrow.draw(origin, destination, color)
                 used_arrows.append(arrow)
                 arrow_count += 1
         self.root.after(3000, self._delayed_callback, used_arrows)
@@ -274,14 +448,12 @@ class TurtleGraphics(BasicGUI):
         self.root.after(3000, self._delayed_callback, [arrow])
 
     def update_peg_moves(self):
-        """Updates move list for all pegs and updates best move, if
-        required."""
+        """Updates move list for all pegs and starts looking for the best
+        move in the background, if required."""
         legal_moves = self.game.find_legal_moves()
-        for peg in self.peg_dir:
-            board_pos = __class__._subtract_offset(peg.pos())
-            peg.possible_moves = legal_moves.get(board_pos, [])
-        if legal_moves and self.game.moves:
-            self.best_move = self._find_best_move()
+        for peg_hole, peg in self.peg_dir.items():
+            peg.possible_moves = legal_moves.get(peg_hole, [])
+        self._request_best_move()
 
     def update_gui(self):
         """Updates GUI to reflect current game conditions."""
@@ -297,7 +469,7 @@ class TurtleGraphics(BasicGUI):
             self.show_moves_btn["state"] = "!disabled"
         else:
             self.show_moves_btn["state"] = "disabled"
-        if legal_moves and self.game.moves:
+        if legal_moves and self.game.moves and self.best_move:
             self.best_move_btn["state"] = "!disabled"
         else:
             self.best_move_btn["state"] = "disabled"
@@ -1,76 +1,765 @@
 """Provides various classes used for finding, storing, and manipulating move
 path data."""
 
-from functools import lru_cache
+import random
+from collections import OrderedDict, namedtuple
+from threading import Event
+from time import perf_counter
 
-from tripeg.game import BaseGame
+from tripeg.bitboard import BitboardGame
+from tripeg.symmetry import Symmetries
 
-class DummyGame(BaseGame):
+class DummyGame(BitboardGame):
     """Used to convert 'MainGame' objects into a more streamlined
     version in order to iterate over move paths at maximum speed."""
 
     def __init__(self, game=None):
         """Initialize self. See help(type(self)) for accurate signature."""
         if game and game.started:
+            super().__init__(game.rows, game.empty)
             self.started = True
-            self.board = game.board.copy()
+            if isinstance(game, BitboardGame):
+                self.bits = game.bits
+            else:
+                self.board = game.board
             self.peg_count = game.peg_count
-            self.moves = game.moves.copy()
+            if isinstance(game, BitboardGame):
+                self._played = game._played.copy()
+            else:
+                self._played = bytearray(self.table.encode_moves(
+                    game.moves))
         else:
+            super().__init__()
             super().__call__()
-        
-class Node:
-    """Wrapper for data allowing it to function as a node."""
 
-    def __init__(self, data=None):
+def _as_dummy_game(game):
+    """Returns 'game' as a 'DummyGame', starting a new one if 'game' is
+    None."""
+    if not game:
+        return DummyGame()
+    if not isinstance(game, DummyGame):
+        return DummyGame(game)
+    return game
+
+class TranspositionTable:
+    """Stores the best reachable peg count, and the move that reaches it,
+    for every board position that has already been solved.
+
+    'PathFinder' keys it on canonical positions (see 'Symmetries'), so
+    the move in each entry is in the canonical frame. If 'maxsize' is
+    given, the oldest entries are evicted to stay within it. There are
+    only a few hundred distinct entries, so each is stored once and
+    shared by every position it applies to.
+    """
+
+    def __init__(self, maxsize=None):
         """Initialize self. See help(type(self)) for accurate signature."""
-        self.data = data
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._shared = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """Return len(self)."""
+        return len(self._entries)
+
+    def __contains__(self, bits):
+        """Return bits in self."""
+        return bits in self._entries
+
+    def get(self, bits):
+        """Returns the '(score, index)' entry for 'bits', or None if the
+        position has not been solved."""
+        entry = self._entries.get(bits)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, bits, score, index):
+        """Records that 'score' pegs can be reached from 'bits' by making
+        the move at 'index' ('None' if no moves are left)."""
+        entries = self._entries
+        if self.maxsize is not None and len(entries) >= self.maxsize:
+            entries.popitem(last=False)
+        entry = (score, index)
+        entries[bits] = self._shared.setdefault(entry, entry)
+
+    def clear(self):
+        """Removes all entries and resets statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """Returns hit/miss statistics and the current size."""
+        return TableInfo(self.hits, self.misses, len(self._entries))
+
+TableInfo = namedtuple("TableInfo", ["hits", "misses", "size"])
 
 class PathFinder:
     """Provides methods to find move paths that meet various criteria.
 
-    Should be called after the player makes a move.
+    Should be called after the player makes a move. Solved positions are
+    kept in 'table' between calls, so later calls on the same instance
+    get cheaper as the game goes on. 'maxsize' bounds the number of
+    positions kept, which matters on boards with more rows. The stored
+    moves only make sense on one board size, so an instance is bound to
+    the 'move_table' of the first game it is given and raises
+    'ValueError' for games on other boards.
+
+    'rank_moves' results are cached in 'rankings', keyed on canonical
+    positions like 'table' and bounded by the same 'maxsize'. The best
+    path is kept in 'path' as move indices, one byte each, and decoded
+    by 'best_path' for callers that want '(peg, move)' pairs.
     """
 
     _game = None
-    best_path = None
+    move_table = None
+    path = None
     best_score = None
 
+    def __init__(self, maxsize=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.table = TranspositionTable(maxsize)
+        self.rankings = OrderedDict()
+
     def __call__(self, game):
         """Call self as function."""
-        if not game:
-            self._game = DummyGame()
-        elif not isinstance(game, DummyGame):
-            self._game = DummyGame(game)
-        else:
-            self._game = game
-        moves = self._game.moves
-        self.possible_paths = dict.fromkeys(range(1,9))
-        root = Node(moves[-1])
-        self._find_paths(root)
-        self._find_paths.cache_clear()
-        found_scores = [score for score in self.possible_paths.keys() if
-                        self.possible_paths[score]]
-        self.best_score = min(found_scores)
-        self.best_path = self.possible_paths[self.best_score]
-
-    @lru_cache(None)
-    def _find_paths(self, node):
-        """Finds possible paths and records them in 'possible_paths'."""
-        legal_moves = self._game.find_legal_moves()
-        if not legal_moves:
-            score = self._game.peg_count
-            if not self.possible_paths[score]:
-                self.possible_paths[score] = self._game.moves.copy()
+        self._prepare(game)
+        bits = self._game.bits
+        self.best_score = self._find_score(bits)
+        self.path = bytes(self._game._played) + self._continuation(bits)
+
+    @property
+    def best_path(self):
+        """The best path found by the last call, moves already made
+        included, as a list of '(peg, move)' pairs."""
+        if self.path is None:
+            return None
+        return self._game.table.decode_moves(self.path)
+
+    def _prepare(self, game):
+        """Converts 'game' into the 'DummyGame' to be searched."""
+        game = _as_dummy_game(game)
+        if self.move_table is None:
+            self.move_table = game.table
+            self._symmetries = Symmetries.of(game.table)
+        elif game.table.rows != self.move_table.rows:
+            raise ValueError("path finder is bound to {}-row boards, got a "
+                             "{}-row game".format(self.move_table.rows,
+                                                  game.table.rows))
+        self._game = game
+
+    def _find_score(self, bits):
+        """Finds the lowest peg count reachable from 'bits' and records it
+        in 'table'."""
+        canonical, transform = self._symmetries.canonical(bits)
+        entry = self.table.get(canonical)
+        if entry is not None:
+            return entry[0]
+        table = self._game.table
+        best_score = None
+        best_index = None
+        for index in table.legal_moves(bits):
+            score = self._find_score(bits ^ table.flips[index])
+            if best_score is None or score < best_score:
+                best_score = score
+                best_index = index
+                if score == 1 or score == 2 and table.min_pegs(bits) == 2:
+                    break
+        if best_score is None:
+            best_score = bin(bits).count("1")
         else:
-            children = []
-            for peg in legal_moves:
-                for move in legal_moves[peg]:
-                    children.append(Node((peg, move)))
-            for child in children:
-                self._game.move(*child.data)
-                self._find_paths(child)
+            best_index = self._symmetries.move_maps[transform][best_index]
+        self.table.store(canonical, best_score, best_index)
+        return best_score
+
+    def _continuation(self, bits):
+        """Follows the best moves recorded in 'table' from 'bits' to the end
+        of the game and returns their indices as bytes."""
+        table = self._game.table
+        symmetries = self._symmetries
+        path = bytearray()
+        while True:
+            canonical, transform = symmetries.canonical(bits)
+            entry = self.table.get(canonical)
+            if entry is None:
+                # Evicted from a bounded table; solve it again.
+                self._find_score(bits)
+                entry = self.table.get(canonical)
+            index = entry[1]
+            if index is None:
+                return bytes(path)
+            index = symmetries.move_maps[symmetries.inverse[transform]][index]
+            path.append(index)
+            bits ^= table.flips[index]
+
+    def rank_moves(self, game):
+        """Returns a '(score, move)' pair for every legal move in 'game',
+        where 'score' is the lowest peg count reachable after making the
+        move, sorted from best to worst."""
+        self._prepare(game)
+        table = self._game.table
+        symmetries = self._symmetries
+        canonical, transform = symmetries.canonical(self._game.bits)
+        ranking = self.rankings.get(canonical)
+        if ranking is None:
+            ranking = sorted((self._find_score(canonical ^ table.flips[i]), i)
+                             for i in table.legal_moves(canonical))
+            self._store_ranking(canonical, ranking)
+        move_map = symmetries.move_maps[symmetries.inverse[transform]]
+        return [(score, table.moves[move_map[index]]) for score, index in
+                ranking]
+
+    def _store_ranking(self, canonical, ranking):
+        """Caches 'ranking' for the canonical position 'canonical',
+        evicting the oldest ranking if 'rankings' is full."""
+        rankings = self.rankings
+        maxsize = self.table.maxsize
+        if maxsize is not None and len(rankings) >= maxsize:
+            rankings.popitem(last=False)
+        rankings[canonical] = ranking
+
+    def cache_info(self):
+        """Returns hit/miss statistics and the size of 'table'."""
+        return self.table.info()
+
+class PathCounter:
+    """Counts move sequences by dynamic programming over the position
+    graph.
+
+    Each position is counted once, keyed on its canonical form, however
+    many sequences lead to it, so the game tree itself is never
+    materialized. Counts are kept between calls on the same instance,
+    which, like 'PathFinder', is bound to the 'move_table' of the first
+    game it is given and raises 'ValueError' for other board sizes.
+    """
+
+    move_table = None
+
+    def __init__(self):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self._counts = {}
+
+    def __len__(self):
+        """Return len(self)."""
+        return len(self._counts)
+
+    def counts(self, game=None):
+        """Returns a dictionary mapping every final peg count reachable
+        from 'game' to the number of distinct move sequences reaching
+        it."""
+        game = self._prepare(game)
+        return dict(sorted(self._count(game.bits).items()))
+
+    def sample(self, game=None, rng=random):
+        """Returns an optimal path from 'game', chosen uniformly at random
+        among all optimal paths.
+
+        Like 'PathFinder.best_path', the result starts with the moves
+        already made in 'game'.
+        """
+        game = self._prepare(game)
+        table = self.move_table
+        bits = game.bits
+        best_score = min(self._count(bits))
+        path = game.moves
+        legal_moves = table.legal_moves(bits)
+        while legal_moves:
+            weights = [self._count(bits ^ table.flips[index]).get(
+                best_score, 0) for index in legal_moves]
+            index = rng.choices(legal_moves, weights)[0]
+            path.append(table.moves[index])
+            bits ^= table.flips[index]
+            legal_moves = table.legal_moves(bits)
+        return path
+
+    def _prepare(self, game):
+        """Converts 'game' into a 'DummyGame', checking that it is played
+        on the board this counter is bound to."""
+        game = _as_dummy_game(game)
+        if self.move_table is None:
+            self.move_table = game.table
+            self._symmetries = Symmetries.of(game.table)
+        elif game.table.rows != self.move_table.rows:
+            raise ValueError("path counter is bound to {}-row boards, got a "
+                             "{}-row game".format(self.move_table.rows,
+                                                  game.table.rows))
+        return game
+
+    def _count(self, bits):
+        """Returns the final peg count histogram of 'bits'."""
+        canonical = self._symmetries.canonical(bits)[0]
+        counts = self._counts.get(canonical)
+        if counts is None:
+            table = self.move_table
+            legal_moves = table.legal_moves(bits)
+            if not legal_moves:
+                counts = {bin(bits).count("1"): 1}
+            else:
+                counts = {}
+                for index in legal_moves:
+                    child = self._count(bits ^ table.flips[index])
+                    for score, count in child.items():
+                        counts[score] = counts.get(score, 0) + count
+            self._counts[canonical] = counts
+        return counts
+
+class SearchCancelled(Exception):
+    """Raised by a 'CancellablePathFinder' whose search was cancelled."""
+
+class CancellablePathFinder(PathFinder):
+    """'PathFinder' whose search can be stopped from another thread.
+
+    'cancel' sets the 'cancelled' event, which makes the running search
+    raise 'SearchCancelled' at its next node; positions solved before
+    that stay in 'table'. The event stays set until the caller clears
+    it.
+    """
+
+    def __init__(self, maxsize=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        super().__init__(maxsize)
+        self.cancelled = Event()
+
+    def cancel(self):
+        """Asks the running search, if any, to stop."""
+        self.cancelled.set()
+
+    def _find_score(self, bits):
+        """Finds the lowest peg count reachable from 'bits' unless the
+        search has been cancelled."""
+        if self.cancelled.is_set():
+            raise SearchCancelled
+        return super()._find_score(bits)
+
+class BudgetExceeded(Exception):
+    """Raised inside 'AnytimePathFinder' when its budget runs out."""
+
+class AnytimePathFinder(CancellablePathFinder):
+    """'PathFinder' that answers within a time or node budget.
+
+    A greedy playout gives a complete path straight away. The search then
+    deepens one move at a time, trying the moves that leave the most
+    moves available first and finishing every line past the depth limit
+    with a greedy playout. 'best_path' is the best complete path found
+    before 'time_limit' seconds pass or 'node_limit' positions have been
+    searched, and 'proven' is True if it is known to be optimal. Only
+    positions solved exactly are stored in 'table'.
+
+    'rank_moves' shares the budget: each move is scored by the best
+    path found after it, so a score may be higher than the move really
+    allows. Only rankings proven exact are kept in 'rankings'.
+    """
+
+    proven = False
+    nodes = 0
+    depth = 0
+
+    def __init__(self, maxsize=None, time_limit=None, node_limit=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        super().__init__(maxsize)
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+
+    def __call__(self, game):
+        """Call self as function."""
+        self._prepare(game)
+        bits = self._game.bits
+        self._start_budget()
+        score, path = self._playout(bits)
+        self.proven = score == self._game.table.min_pegs(bits)
         try:
-            self._game.undo()
-        except IndexError:
+            while not self.proven:
+                new_score, new_path, self.proven = self._search(bits,
+                                                                self.depth)
+                if new_score <= score:
+                    score, path = new_score, new_path
+                self.depth += 1
+        except BudgetExceeded:
             pass
+        self.best_score = score
+        self.path = bytes(self._game._played) + bytes(path)
+
+    def rank_moves(self, game):
+        """Returns a '(score, move)' pair for every legal move in 'game',
+        sorted from best to worst, searching within the budget.
+
+        Each move is scored by the best path found after it. 'proven' is
+        True if every score is exact.
+        """
+        self._prepare(game)
+        table = self._game.table
+        symmetries = self._symmetries
+        bits = self._game.bits
+        canonical, transform = symmetries.canonical(bits)
+        if canonical in self.rankings:
+            self.proven = True
+            return super().rank_moves(game)
+        self._start_budget()
+        scores = {}
+        exact = {}
+        for index in table.legal_moves(bits):
+            scores[index] = self._playout(bits ^ table.flips[index])[0]
+            exact[index] = False
+        try:
+            while not all(exact.values()):
+                for index in scores:
+                    if exact[index]:
+                        continue
+                    score, path, exact[index] = self._search(
+                        bits ^ table.flips[index], self.depth)
+                    scores[index] = min(scores[index], score)
+                self.depth += 1
+        except BudgetExceeded:
+            pass
+        self.proven = all(exact.values())
+        if self.proven:
+            move_map = symmetries.move_maps[transform]
+            self._store_ranking(canonical, sorted(
+                (score, move_map[index]) for index, score in
+                scores.items()))
+        return sorted((score, table.moves[index]) for index, score in
+                      scores.items())
+
+    def _start_budget(self):
+        """Resets the node count, depth and deadline before a search."""
+        self.nodes = 0
+        self.depth = 0
+        self.proven = False
+        self._deadline = None
+        if self.time_limit is not None:
+            self._deadline = perf_counter() + self.time_limit
+
+    def _count_node(self):
+        """Counts a searched position, raising 'BudgetExceeded' once the
+        budget is spent."""
+        if self.cancelled.is_set():
+            raise SearchCancelled
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise BudgetExceeded
+        if self._deadline is not None and perf_counter() > self._deadline:
+            raise BudgetExceeded
+
+    def _ordered_moves(self, bits):
+        """Returns the legal moves on 'bits', those leaving the most legal
+        moves first."""
+        table = self._game.table
+        return sorted(table.legal_moves(bits), key=lambda index: -len(
+            table.legal_moves(bits ^ table.flips[index])))
+
+    def _playout(self, bits):
+        """Plays the first move from '_ordered_moves' until the game ends
+        and returns '(score, path)'."""
+        table = self._game.table
+        path = []
+        moves = self._ordered_moves(bits)
+        while moves:
+            path.append(moves[0])
+            bits ^= table.flips[moves[0]]
+            moves = self._ordered_moves(bits)
+        return bin(bits).count("1"), path
+
+    def _stored_path(self, bits):
+        """Follows 'table' from 'bits' to the end of the game, returning
+        '(score, path)', or None if an entry on the way is missing."""
+        table = self._game.table
+        symmetries = self._symmetries
+        score = None
+        path = []
+        while True:
+            canonical, transform = symmetries.canonical(bits)
+            entry = self.table.get(canonical)
+            if entry is None:
+                return None
+            if score is None:
+                score = entry[0]
+            index = entry[1]
+            if index is None:
+                return score, path
+            index = symmetries.move_maps[symmetries.inverse[transform]][index]
+            path.append(index)
+            bits ^= table.flips[index]
+
+    def _search(self, bits, depth):
+        """Searches 'depth' moves below 'bits' and returns '(score, path,
+        exact)', where 'exact' is True if 'score' is the lowest peg count
+        reachable from 'bits'."""
+        self._count_node()
+        stored = self._stored_path(bits)
+        if stored is not None:
+            return stored + (True,)
+        table = self._game.table
+        moves = self._ordered_moves(bits)
+        if not moves:
+            score = bin(bits).count("1")
+            self._store(bits, score, None)
+            return score, [], True
+        if not depth:
+            score, path = self._playout(bits)
+            return score, path, False
+        lower_bound = table.min_pegs(bits)
+        best_score = best_path = None
+        exact = True
+        for index in moves:
+            score, path, child_exact = self._search(
+                bits ^ table.flips[index], depth - 1)
+            exact = exact and child_exact
+            if best_score is None or score < best_score:
+                best_score, best_path = score, [index] + path
+                if score == lower_bound:
+                    exact = True
+                    break
+        if exact:
+            self._store(bits, best_score, best_path[0])
+        return best_score, best_path, exact
+
+    def _store(self, bits, score, index):
+        """Stores the exact 'score' of 'bits' in 'table'."""
+        canonical, transform = self._symmetries.canonical(bits)
+        if index is not None:
+            index = self._symmetries.move_maps[transform][index]
+        self.table.store(canonical, score, index)
+
+class SearchStats:
+    """Counters collected by an 'InstrumentedPathFinder'.
+
+    'move_count' is the number of moves already made when the search
+    started. 'phases' maps phase names to wall time in seconds.
+    """
+
+    _COUNTERS = ("calls", "nodes", "terminals", "hits", "misses")
+
+    def __init__(self, move_count=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.move_count = move_count
+        self.calls = 0
+        self.nodes = 0
+        self.terminals = 0
+        self.hits = 0
+        self.misses = 0
+        self.max_depth = 0
+        self.phases = {}
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(key, value) for key, value in
+            self.as_dict().items()))
+
+    def merge(self, other):
+        """Adds the counters of 'other' to this one."""
+        for counter in __class__._COUNTERS:
+            setattr(self, counter, getattr(self, counter) +
+                    getattr(other, counter))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for phase, seconds in other.phases.items():
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def as_dict(self):
+        """Returns the statistics as a dictionary."""
+        stats = {"move_count": self.move_count}
+        for counter in __class__._COUNTERS:
+            stats[counter] = getattr(self, counter)
+        stats["max_depth"] = self.max_depth
+        stats["phases"] = dict(self.phases)
+        return stats
+
+class InstrumentedPathFinder(PathFinder):
+    """'PathFinder' that records 'SearchStats' for every call.
+
+    'stats' holds the statistics of the last call and 'by_move_count'
+    totals them by the number of moves made when each search started.
+    Every function in 'hooks' is called with the 'SearchStats' of each
+    call as it finishes. 'profiler' can be anything with 'enable' and
+    'disable' methods, such as a 'cProfile.Profile'; it is only enabled
+    during the search phase. A plain 'PathFinder' pays nothing for any
+    of this.
+    """
+
+    stats = None
+
+    def __init__(self, maxsize=None, hooks=(), profiler=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        super().__init__(maxsize)
+        self.hooks = list(hooks)
+        self.profiler = profiler
+        self.by_move_count = {}
+
+    def __call__(self, game):
+        """Call self as function."""
+        stats = self._stats = SearchStats()
+        start = perf_counter()
+        self._prepare(game)
+        prepared = perf_counter()
+        stats.move_count = len(self._game.moves)
+        bits = self._game.bits
+        hits, misses = self.table.hits, self.table.misses
+        self._depth = 0
+        if self.profiler:
+            self.profiler.enable()
+        try:
+            self.best_score = self._find_score(bits)
+        finally:
+            if self.profiler:
+                self.profiler.disable()
+        searched = perf_counter()
+        stats.hits = self.table.hits - hits
+        stats.misses = stats.nodes = self.table.misses - misses
+        self.path = bytes(self._game._played) + self._continuation(bits)
+        finished = perf_counter()
+        stats.calls = 1
+        stats.phases = {"prepare": prepared - start,
+                        "search": searched - prepared,
+                        "path": finished - searched}
+        self.stats = stats
+        total = self.by_move_count.setdefault(stats.move_count,
+                                              SearchStats(stats.move_count))
+        total.merge(stats)
+        for hook in self.hooks:
+            hook(stats)
+
+    def _find_score(self, bits):
+        """Finds the lowest peg count reachable from 'bits' and records it
+        in 'table', counting depth and terminal positions."""
+        stats = self._stats
+        misses = self.table.misses
+        if self._depth > stats.max_depth:
+            stats.max_depth = self._depth
+        self._depth += 1
+        try:
+            return super()._find_score(bits)
+        finally:
+            self._depth -= 1
+            if (self.table.misses != misses and
+                not self._game.table.legal_moves(bits)):
+                stats.terminals += 1
+
+class ParallelPathFinder(PathFinder):
+    """'PathFinder' that spreads the search across a process pool.
+
+    The first 'split_depth' moves are expanded in this process and each
+    distinct resulting position is solved by a worker. Results are taken
+    as they finish; as soon as one reaches the root's lower bound (see
+    'MoveTable.min_pegs') the subtrees still waiting are cancelled, just
+    as the serial search stops there. Workers keep their transposition
+    tables between subtrees and send back only their best path, whose
+    positions are stored in 'table'. Process start-up costs tens of
+    milliseconds, so this only pays off on searches that take seconds;
+    see 'tripeg.benchmarks.parallel'.
+    """
+
+    def __init__(self, workers=None, split_depth=2, maxsize=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        super().__init__(maxsize)
+        self.workers = workers
+        self.split_depth = split_depth
+
+    def __call__(self, game):
+        """Call self as function."""
+        self._prepare(game)
+        game = self._game
+        bits = game.bits
+        if (self._symmetries.canonical(bits)[0] in self.table or
+            not game.table.legal_moves(bits)):
+            super().__call__(game)
+            return
+        # Imported here because they pull in 'multiprocessing', which
+        # nothing else needs.
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from multiprocessing import Event as ProcessEvent
+        lower_bound = game.table.min_pegs(bits)
+        best_score = best_path = None
+        stop = ProcessEvent()
+        pool = ProcessPoolExecutor(self.workers, initializer=_start_worker,
+                                   initargs=(stop,))
+        try:
+            futures = {pool.submit(_solve_subtree, game.rows, child,
+                                   self.table.maxsize): prefix for
+                       child, prefix in self._expand(bits, self.split_depth)}
+            for future in as_completed(futures):
+                score, path = future.result()
+                if best_score is None or score < best_score:
+                    best_score, best_path = score, futures[future] + path
+                    if score == lower_bound:
+                        break
+        finally:
+            # Stops the subtrees already running as well as those still
+            # waiting.
+            stop.set()
+            pool.shutdown(cancel_futures=True)
+        self.best_score = best_score
+        self.path = bytes(game._played) + best_path
+        self._store_path(bits, best_score, best_path)
+
+    def _expand(self, bits, depth):
+        """Returns '(position, prefix)' for every distinct canonical
+        position 'depth' moves below 'bits', where 'prefix' holds the
+        indices of the moves leading there. Lines that end sooner stay
+        at their last position."""
+        table = self._game.table
+        layer = {bits: b""}
+        for i in range(depth):
+            next_layer = {}
+            for child, prefix in layer.items():
+                moves = table.legal_moves(child)
+                if not moves:
+                    next_layer.setdefault(child, prefix)
+                for index in moves:
+                    next_layer.setdefault(child ^ table.flips[index],
+                                          prefix + bytes([index]))
+            layer = next_layer
+        frontier = {}
+        for child, prefix in layer.items():
+            frontier.setdefault(self._symmetries.canonical(child)[0],
+                                (child, prefix))
+        return list(frontier.values())
+
+    def _store_path(self, bits, score, path):
+        """Stores every position along 'path', an optimal path from
+        'bits' reaching 'score' pegs, in 'table'."""
+        table = self._game.table
+        symmetries = self._symmetries
+        for index in list(path) + [None]:
+            canonical, transform = symmetries.canonical(bits)
+            if index is None:
+                self.table.store(canonical, score, None)
+            else:
+                self.table.store(canonical, score,
+                                 symmetries.move_maps[transform][index])
+                bits ^= table.flips[index]
+
+# Set in each worker process by '_start_worker'.
+_worker_path_finders = None
+_worker_stop = None
+
+def _start_worker(stop):
+    """Sets up a worker process for 'ParallelPathFinder', 'stop' being
+    the event that cancels its searches."""
+    global _worker_path_finders, _worker_stop
+    # Kept between subtrees, keyed on '(rows, maxsize)'.
+    _worker_path_finders = {}
+    _worker_stop = stop
+
+def _solve_subtree(rows, bits, maxsize):
+    """Solves the position 'bits' on a board with 'rows' rows in a worker
+    process and returns '(score, path)', 'path' being move indices."""
+    game = BitboardGame(rows)
+    game()
+    game = DummyGame(game)
+    game.bits = bits
+    game.peg_count = bin(bits).count("1")
+    key = (rows, maxsize)
+    path_finder = _worker_path_finders.get(key)
+    if path_finder is None:
+        path_finder = _worker_path_finders[key] = CancellablePathFinder(
+            maxsize)
+        path_finder.cancelled = _worker_stop
+    path_finder(game)
+    return path_finder.best_score, path_finder.path
@@ -0,0 +1,178 @@
+"""Single-file, memory-mapped replacement for the shelve 'paths' database.
+
+Keys are canonical opening move sequences (see 'Symmetries') and values
+are lists of best move paths that continue them. Moves are stored as
+one-byte indices into 'MOVE_TABLE'. The file layout is:
+
+    header    magic, version, key width, key count
+    keys      fixed-width sorted keys: length byte + moves, 0xFF padded
+    offsets   'key count + 1' little-endian uint32 offsets into values
+    values    per key: path count, then per path: length byte + moves
+
+Convert the old database with 'python -m tripeg.pathdb'.
+"""
+
+import mmap
+import os
+import struct
+from time import perf_counter
+
+from tripeg import DATA_DIR
+from tripeg.bitboard import MOVE_TABLE
+from tripeg.symmetry import Symmetries
+
+FILENAME = os.path.join(DATA_DIR, "paths.tpdb")
+SHELF = os.path.join(DATA_DIR, "paths")
+
+class PathDatabase:
+    """Read-only view of a path database that stays open between lookups.
+
+    Lookups binary search the sorted key index and decode only the
+    matching value, straight from the memory map.
+    """
+
+    MAGIC = b"TPPD"
+    VERSION = 1
+    _HEADER = struct.Struct("<4sBBI")
+    _OFFSET = struct.Struct("<I")
+    _PAD = 0xFF
+
+    def __init__(self, filename=FILENAME, table=MOVE_TABLE):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.table = table
+        with open(filename, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._key_width, self._count = (
+            __class__._HEADER.unpack_from(self._map))
+        if magic != __class__.MAGIC or version != __class__.VERSION:
+            self._map.close()
+            raise ValueError("{} is not a path database".format(filename))
+        self._keys = __class__._HEADER.size
+        self._offsets = self._keys + self._count*self._key_width
+        self._values = self._offsets + (self._count + 1)*(
+            __class__._OFFSET.size)
+        self._view = memoryview(self._map)
+
+    def __len__(self):
+        """Return len(self)."""
+        return self._count
+
+    def __contains__(self, moves):
+        """Return key in self."""
+        return self._find(moves) is not None
+
+    def __getitem__(self, moves):
+        """Returns the paths stored for the move sequence 'moves'."""
+        position = self._find(moves)
+        if position is None:
+            raise KeyError(moves)
+        start, = __class__._OFFSET.unpack_from(
+            self._map, self._offsets + position*__class__._OFFSET.size)
+        return self._decode_paths(self._values + start)
+
+    @classmethod
+    def encode_key(cls, indices, key_width):
+        """Encodes a sequence of move indices as a fixed-width key."""
+        key = bytes([len(indices)]) + bytes(indices)
+        return key + bytes([cls._PAD])*(key_width - len(key))
+
+    def _find(self, moves):
+        """Returns the index position of 'moves', or None if absent."""
+        try:
+            indices = [self.table.move_index[move] for move in moves]
+        except KeyError:
+            return None
+        if len(indices) >= self._key_width:
+            return None
+        key = self.encode_key(indices, self._key_width)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high)//2
+            start = self._keys + middle*self._key_width
+            found = self._map[start:start + self._key_width]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _decode_paths(self, start):
+        """Decodes the list of paths stored at 'start'."""
+        moves = self.table.moves
+        view = self._view
+        paths = []
+        for i in range(view[start]):
+            length = view[start + 1]
+            path = view[start + 2:start + 2 + length]
+            paths.append([moves[index] for index in path])
+            start += 1 + length
+        return paths
+
+    def close(self):
+        """Closes the underlying memory map."""
+        self._view.release()
+        self._map.close()
+
+def write(filename, entries, table=MOVE_TABLE):
+    """Writes a path database from a mapping of move sequences to lists of
+    paths, all in '(peg, move)' form.
+
+    Keys are stored in their canonical form (see 'Symmetries'), with
+    their paths mapped by the same transform, so symmetric openings
+    share one key and their paths are merged.
+    """
+    symmetries = Symmetries.of(table)
+    encoded = {}
+    for moves, paths in entries.items():
+        indices, transform = symmetries.canonical_moves(
+            [table.move_index[move] for move in moves])
+        merged = encoded.setdefault(tuple(indices), [])
+        for path in paths:
+            path = bytes(symmetries.transform_moves(
+                [table.move_index[move] for move in path], transform))
+            if path not in merged:
+                merged.append(path)
+    key_width = 1 + max(len(key) for key in encoded)
+    keys = sorted(encoded, key=lambda key: PathDatabase.encode_key(
+        key, key_width))
+    values = bytearray()
+    offsets = []
+    for key in keys:
+        offsets.append(len(values))
+        values.append(len(encoded[key]))
+        for path in encoded[key]:
+            values.append(len(path))
+            values += path
+    offsets.append(len(values))
+    with open(filename, "wb") as file:
+        file.write(PathDatabase._HEADER.pack(PathDatabase.MAGIC,
+                                             PathDatabase.VERSION, key_width,
+                                             len(keys)))
+        for key in keys:
+            file.write(PathDatabase.encode_key(key, key_width))
+        for offset in offsets:
+            file.write(PathDatabase._OFFSET.pack(offset))
+        file.write(values)
+
+def convert(shelf=SHELF, filename=FILENAME, table=MOVE_TABLE):
+    """Converts a shelve database keyed on 'str(moves)' into a path
+    database and returns the number of keys written."""
+    # Only conversion needs these, and they are slow to import.
+    import shelve
+    from ast import literal_eval
+    with shelve.open(shelf, "r") as db:
+        entries = {tuple(literal_eval(key)): db[key] for key in db}
+    write(filename, entries, table)
+    return len(entries)
+
+def main():
+    """Converts the shelve database in 'DATA_DIR'."""
+    start = perf_counter()
+    count = convert()
+    print("Converted {} keys in {:.3f} s to {}.".format(
+        count, perf_counter() - start, FILENAME))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Local solver service shared by any number of clients.
+
+Run with 'python -m tripeg.server [--listen ADDRESS]', where ADDRESS is
+either 'HOST:PORT' or the path of a Unix socket. Clients send one JSON
+object per line:
+
+    {"id": 1, "op": "best_move", "rows": 5, "position": "[[[2,4],[2,4]]]"}
+
+'position' takes any of the forms accepted by 'python -m tripeg.solve'
+and 'op' is 'best_move', 'rank_moves' or 'stats'. Every answer is one
+JSON line carrying the same 'id'; answers to one client may arrive out
+of order. All clients share one 'PathFinder' per board size, and
+requests for a position that is already being solved wait for that
+result rather than starting another search. Positions that arrive while
+the solver is busy are solved together in the next batch.
+
+'SolverClient' can stand in for a 'PathFinder', for example in
+'TurtleGraphics'.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from tripeg.movepaths import DummyGame, PathFinder, SearchCancelled
+from tripeg.solve import parse_game
+
+OPS = ("best_move", "rank_moves", "stats")
+
+def parse_address(address):
+    """Returns '(host, port)' for a 'HOST:PORT' address and the path
+    itself for a Unix socket."""
+    host, colon, port = address.rpartition(":")
+    if colon and port.isdigit() and os.sep not in address:
+        return host or "localhost", int(port)
+    return address
+
+def _encode_move(move):
+    """Converts a '(peg, move)' pair into nested lists for JSON."""
+    return [list(move[0]), list(move[1])]
+
+def _decode_move(move):
+    """Converts a move decoded from JSON back into a '(peg, move)'
+    pair."""
+    return tuple(move[0]), tuple(move[1])
+
+class SolverServer:
+    """Answers solver requests from any number of connections.
+
+    Searches run one batch at a time on a single worker thread, so the
+    event loop stays free to accept and deduplicate requests meanwhile.
+    'maxsize' bounds each board size's 'PathFinder' cache.
+    """
+
+    def __init__(self, maxsize=None):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.maxsize = maxsize
+        self.requests = 0
+        self.solved = 0
+        self.batches = 0
+        self.shared = 0
+        self._path_finders = {}
+        self._pending = {}
+        self._queue = None
+        self._executor = ThreadPoolExecutor(1)
+
+    async def serve(self, address):
+        """Listens on 'address' (see 'parse_address') until cancelled."""
+        address = parse_address(address)
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self._handle, *address)
+        else:
+            server = await asyncio.start_unix_server(self._handle, address)
+        self._queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(self._solve_batches())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if not isinstance(address, tuple) and os.path.exists(address):
+                os.remove(address)
+
+    async def _handle(self, reader, writer):
+        """Reads requests from one connection and answers each as soon as
+        it is ready."""
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer):
+        """Answers the request 'line' on 'writer'."""
+        self.requests += 1
+        response = {"id": None}
+        try:
+            request = json.loads(line)
+            response["id"] = request.get("id")
+            op = request.get("op", "best_move")
+            if op not in OPS:
+                raise ValueError("unknown op {!r}".format(op))
+            if op == "stats":
+                response.update(self.stats())
+            else:
+                game = parse_game(str(request["position"]),
+                                  int(request.get("rows", 5)))
+                result = await self._solve(op, game)
+                if op == "best_move":
+                    score, path = result
+                    response["best_score"] = score
+                    response["best_path"] = [_encode_move(move) for move in
+                                             game.moves + path]
+                else:
+                    response["ranking"] = [[score, _encode_move(move)] for
+                                           score, move in result]
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            response["error"] = "invalid request: {}".format(error)
+        except Exception as error:
+            # Anything else is the solver's fault, but the client still
+            # gets an answer rather than waiting for its timeout.
+            response["error"] = "solver error: {!r}".format(error)
+        writer.write(json.dumps(response).encode() + b"\n")
+
+    async def _solve(self, op, game):
+        """Returns the result of 'op' on 'game', joining any identical
+        request already waiting."""
+        key = (op, game.rows, game.bits)
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = asyncio.get_running_loop(
+                ).create_future()
+            self._queue.put_nowait((key, game))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    async def _solve_batches(self):
+        """Hands every waiting position to the worker thread in one
+        batch, forever."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            results = await loop.run_in_executor(self._executor,
+                                                 self._solve_batch, batch)
+            self.batches += 1
+            for (key, game), result in zip(batch, results):
+                future = self._pending.pop(key)
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _solve_batch(self, batch):
+        """Solves every '(key, game)' in 'batch' on the worker thread and
+        returns the results (or exceptions) in the same order."""
+        results = []
+        for (op, rows, bits), game in batch:
+            try:
+                if rows not in self._path_finders:
+                    self._path_finders[rows] = PathFinder(self.maxsize)
+                path_finder = self._path_finders[rows]
+                if op == "best_move":
+                    path_finder(game)
+                    results.append((path_finder.best_score,
+                                    path_finder.best_path[len(game.moves):]))
+                else:
+                    results.append(path_finder.rank_moves(game))
+            except Exception as error:
+                # Handed to the waiting requests rather than ending the
+                # batch, so one bad position cannot stall the others.
+                results.append(error)
+            self.solved += 1
+        return results
+
+    def stats(self):
+        """Returns counters describing the work done so far."""
+        return {"requests": self.requests, "solved": self.solved,
+                "batches": self.batches, "shared": self.shared,
+                "positions": {rows: len(path_finder.table) for rows,
+                              path_finder in self._path_finders.items()}}
+
+class SolverClient:
+    """Stand-in for 'PathFinder' that asks a 'SolverServer' instead of
+    searching in this process.
+
+    Like 'CancellablePathFinder', it has a 'cancelled' event: a request
+    that was cancelled while waiting for its answer raises
+    'SearchCancelled'. 'timeout' is the number of seconds to wait for
+    the server before giving up with an 'OSError', which is also the
+    longest a cancelled request can keep waiting. One client must not be
+    used by several threads at once.
+    """
+
+    best_path = None
+    best_score = None
+
+    def __init__(self, address, timeout=5.0):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.address = address
+        self.timeout = timeout
+        self.cancelled = Event()
+        self._file = None
+        self._next_id = 0
+
+    def __call__(self, game):
+        """Call self as function."""
+        game = self._prepare(game)
+        response = self._request("best_move", game)
+        self.best_score = response["best_score"]
+        self.best_path = game.moves + [_decode_move(move) for move in
+                                       response["best_path"]]
+
+    def rank_moves(self, game):
+        """Returns the same ranking as 'PathFinder.rank_moves'."""
+        response = self._request("rank_moves", self._prepare(game))
+        return [(score, _decode_move(move)) for score, move in
+                response["ranking"]]
+
+    def cancel(self):
+        """Asks the waiting request, if any, to give up on its answer."""
+        self.cancelled.set()
+
+    def close(self):
+        """Closes the connection to the server."""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _prepare(self, game):
+        """Converts 'game' into a 'DummyGame'."""
+        if not isinstance(game, DummyGame):
+            game = DummyGame(game)
+        return game
+
+    def _connect(self):
+        """Opens the connection to the server, if it is not open yet."""
+        if self._file:
+            return
+        address = parse_address(self.address)
+        if isinstance(address, tuple):
+            connection = socket.create_connection(address, self.timeout)
+        else:
+            connection = socket.socket(socket.AF_UNIX)
+            connection.settimeout(self.timeout)
+            connection.connect(address)
+        self._file = connection.makefile("rwb")
+        connection.close()
+
+    def _request(self, op, game):
+        """Sends a request about 'game' and returns the decoded answer."""
+        self._connect()
+        self._next_id += 1
+        request = {"id": self._next_id, "op": op, "rows": game.rows,
+                   "position": str(game.bits)}
+        try:
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            while True:
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("solver server closed the "
+                                          "connection")
+                response = json.loads(line)
+                if response["id"] == self._next_id:
+                    break
+        except (OSError, ValueError):
+            self.close()
+            raise
+        if self.cancelled.is_set():
+            raise SearchCancelled
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+def main(argv=None):
+    """Parses arguments and runs the server until interrupted."""
+    parser = argparse.ArgumentParser(prog="python -m tripeg.server",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--listen", default="localhost:7467",
+                        help="HOST:PORT or Unix socket path "
+                        "(default: localhost:7467)")
+    parser.add_argument("--maxsize", type=int, default=1000000,
+                        help="maximum positions kept in each solver's "
+                        "cache (default: 1000000)")
+    args = parser.parse_args(argv)
+    if args.maxsize < 1:
+        parser.error("--maxsize must be at least 1")
+    try:
+        asyncio.run(SolverServer(args.maxsize).serve(args.listen))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
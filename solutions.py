@@ -0,0 +1,171 @@
+"""Builds and reads a precomputed table of the best moves for every
+position reachable from any starting hole.
+
+The table is a flat file with one fixed-width record per board bitmask,
+so a lookup is a single read from a memory-mapped file. Only canonical
+positions (see 'Symmetries') are filled in, so symmetric starts share
+their records and only one start from each symmetry class is solved.
+Build it with 'python -m tripeg.solutions'.
+"""
+
+import mmap
+import os
+import struct
+from time import perf_counter
+
+from tripeg import DATA_DIR
+from tripeg.bitboard import MOVE_TABLE
+from tripeg.symmetry import Symmetries
+
+FILENAME = os.path.join(DATA_DIR, "solutions.bin")
+
+def _map_mask(mask, move_map):
+    """Moves every bit 'i' of the move mask 'mask' to 'move_map[i]'."""
+    mapped = 0
+    index = 0
+    while mask:
+        if mask & 1:
+            mapped |= 1 << move_map[index]
+        mask >>= 1
+        index += 1
+    return mapped
+
+class SolutionTable:
+    """Memory-mapped reader for a table written by 'build'.
+
+    Record 'bits' holds the best final peg count reachable from the
+    canonical board 'bits' (0 if the position was not reached while
+    building) followed by a bitmask of every move index that reaches it.
+    Lookups accept any board and map it to and from its canonical form.
+    """
+
+    MAGIC = b"TPST"
+    VERSION = 2
+    _HEADER = struct.Struct("<4sBBHH")
+
+    def __init__(self, filename=FILENAME, table=MOVE_TABLE):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.table = table
+        self._symmetries = Symmetries.of(table)
+        with open(filename, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, holes, moves, self._record_size = (
+            __class__._HEADER.unpack_from(self._map))
+        if (magic != __class__.MAGIC or version != __class__.VERSION or
+            holes != len(table.holes) or moves != len(table.moves)):
+            self._map.close()
+            raise ValueError("{} does not match this board".format(filename))
+        self._offset = __class__._HEADER.size
+
+    @classmethod
+    def record_size(cls, table):
+        """Returns the width in bytes of one record for 'table'."""
+        return 1 + (len(table.moves) + 7)//8
+
+    def lookup(self, bits):
+        """Returns '(score, move_mask)' for the board 'bits'."""
+        symmetries = self._symmetries
+        canonical, transform = symmetries.canonical(bits)
+        start = self._offset + canonical*self._record_size
+        record = self._map[start:start + self._record_size]
+        mask = int.from_bytes(record[1:], "little")
+        if transform:
+            mask = _map_mask(mask, symmetries.move_maps[
+                symmetries.inverse[transform]])
+        return record[0], mask
+
+    def best_score(self, bits):
+        """Returns the best final peg count reachable from 'bits', or None
+        if the table does not cover the position."""
+        canonical = self._symmetries.canonical(bits)[0]
+        return self._map[self._offset + canonical*self._record_size] or None
+
+    def best_moves(self, bits):
+        """Returns every '(peg, move)' that keeps the best final peg count
+        reachable from 'bits'."""
+        score, mask = self.lookup(bits)
+        return [self.table.moves[i] for i in range(len(self.table.moves)) if
+                mask >> i & 1]
+
+    def close(self):
+        """Closes the underlying memory map."""
+        self._map.close()
+
+def solve_layers(table=MOVE_TABLE, starts=None):
+    """Solves every position reachable from 'starts' by retrograde
+    analysis.
+
+    Positions are generated one move at a time from the start, then
+    solved from the last layer back, so each position's successors are
+    always solved first. Returns a dictionary mapping each position to
+    '(score, move_mask)'.
+    """
+    if starts is None:
+        starts = [table.start]
+    layers = [set(starts)]
+    while layers[-1]:
+        layers.append({bits ^ table.flips[i] for bits in layers[-1] for i in
+                       table.legal_moves(bits)})
+    solved = {}
+    for layer in reversed(layers):
+        for bits in layer:
+            children = [(solved[bits ^ table.flips[i]][0], i) for i in
+                        table.legal_moves(bits)]
+            if not children:
+                solved[bits] = (bin(bits).count("1"), 0)
+                continue
+            best_score = min(children)[0]
+            mask = 0
+            for score, i in children:
+                if score == best_score:
+                    mask |= 1 << i
+            solved[bits] = (best_score, mask)
+    return solved
+
+def all_starts(table=MOVE_TABLE):
+    """Returns the starting position for every choice of empty hole."""
+    return [table.full ^ 1 << i for i in range(len(table.holes))]
+
+def build(filename=FILENAME, table=MOVE_TABLE, starts=None):
+    """Writes a solution table for every position reachable from
+    'starts' (by default, from every starting hole) and returns the
+    number of records written."""
+    if starts is None:
+        starts = all_starts(table)
+    symmetries = Symmetries.of(table)
+    solved = solve_layers(table, sorted({symmetries.canonical(bits)[0] for
+                                         bits in starts}))
+    records = {}
+    for bits, (score, mask) in solved.items():
+        canonical, transform = symmetries.canonical(bits)
+        if canonical not in records:
+            records[canonical] = (score, _map_mask(
+                mask, symmetries.move_maps[transform]))
+    record_size = SolutionTable.record_size(table)
+    data = bytearray((table.full + 1)*record_size)
+    for bits, (score, mask) in records.items():
+        start = bits*record_size
+        data[start] = score
+        data[start + 1:start + record_size] = mask.to_bytes(
+            record_size - 1, "little")
+    with open(filename, "wb") as file:
+        file.write(SolutionTable._HEADER.pack(SolutionTable.MAGIC,
+                                              SolutionTable.VERSION,
+                                              len(table.holes),
+                                              len(table.moves), record_size))
+        file.write(data)
+    return len(records)
+
+def main():
+    """Builds the solution table and reports its size."""
+    start = perf_counter()
+    count = build()
+    elapsed = perf_counter() - start
+    size = SolutionTable._HEADER.size + (MOVE_TABLE.full + 1)*(
+        SolutionTable.record_size(MOVE_TABLE))
+    print("Solved {} canonical positions from {} starting holes in {:.2f} "
+          "s; wrote {} ({} bytes).".format(count, len(MOVE_TABLE.holes),
+                                           elapsed, FILENAME, size))
+
+if __name__ == "__main__":
+    main()
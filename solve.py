@@ -0,0 +1,122 @@
+"""Headless batch solver that streams results as JSON lines.
+
+Run with 'python -m tripeg.solve [FILE]'. Each input line is one of:
+
+    a JSON list of moves played from the start, e.g. [[[2,4],[2,4]]]
+    a string of 0s and 1s, one per hole in 'MoveTable' order
+    a board bitmask as a decimal integer
+
+and produces one JSON object with the best final peg count, the best
+path, the number of positions searched and the time taken ('--stats'
+adds the full 'SearchStats'). Results are
+written as soon as each line is solved, so input of any length is
+processed in constant memory (see '--maxsize'). With '--time-limit' or
+'--node-limit', each line gets the best path found within the budget and
+a 'proven' flag saying whether it is known to be optimal.
+"""
+
+import argparse
+import json
+import sys
+from time import perf_counter
+
+from tripeg.bitboard import BitboardGame, MoveTable
+from tripeg.movepaths import (AnytimePathFinder, DummyGame,
+                              InstrumentedPathFinder, PathFinder)
+from tripeg.symmetry import Symmetries
+
+def parse_game(line, rows=5):
+    """Parses one input line into a 'DummyGame'."""
+    game = BitboardGame(rows)
+    game()
+    line = line.strip()
+    if line.startswith("["):
+        for peg, move in json.loads(line):
+            if not game.table.is_legal(game.bits, game.table.move_index[
+                    (tuple(peg), tuple(move))]):
+                raise ValueError("illegal move {}".format([peg, move]))
+            game.move(tuple(peg), tuple(move))
+        return DummyGame(game)
+    if set(line) <= {"0", "1"} and len(line) == len(game.table.holes):
+        bits = int(line[::-1], 2)
+    else:
+        bits = int(line)
+    if not 0 <= bits <= game.table.full:
+        raise ValueError("board {} out of range".format(bits))
+    game = DummyGame(game)
+    game.bits = bits
+    game.peg_count = bin(bits).count("1")
+    return game
+
+def solve_lines(lines, rows=5, maxsize=None, stats=False, time_limit=None,
+                node_limit=None):
+    """Solves each line of 'lines' and yields a result dictionary."""
+    anytime = time_limit is not None or node_limit is not None
+    if anytime:
+        path_finder = AnytimePathFinder(maxsize, time_limit, node_limit)
+    elif stats:
+        path_finder = InstrumentedPathFinder(maxsize)
+    else:
+        path_finder = PathFinder(maxsize)
+    # Builds the shared tables up front so the first result is not
+    # charged for them.
+    Symmetries.of(MoveTable.for_rows(rows))
+    for line in lines:
+        if not line.strip():
+            continue
+        result = {"input": line.strip()}
+        try:
+            game = parse_game(line, rows)
+        except (ValueError, KeyError, TypeError) as error:
+            result["error"] = "invalid input: {}".format(error)
+            yield result
+            continue
+        misses = path_finder.table.misses
+        start = perf_counter()
+        path_finder(game)
+        result["best_score"] = path_finder.best_score
+        result["best_path"] = path_finder.best_path
+        result["nodes"] = path_finder.table.misses - misses
+        result["seconds"] = round(perf_counter() - start, 6)
+        if anytime:
+            result["nodes"] = path_finder.nodes
+            result["proven"] = path_finder.proven
+        elif stats:
+            result["stats"] = path_finder.stats.as_dict()
+        yield result
+
+def main(argv=None):
+    """Parses arguments and streams results to stdout."""
+    parser = argparse.ArgumentParser(prog="python -m tripeg.solve",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("file", nargs="?", type=argparse.FileType("r"),
+                        default=sys.stdin,
+                        help="input file (default: standard input)")
+    parser.add_argument("--rows", type=int, default=5,
+                        help="number of rows on the board (default: 5)")
+    parser.add_argument("--maxsize", type=int, default=1000000,
+                        help="maximum positions kept in the solver's "
+                        "cache (default: 1000000)")
+    parser.add_argument("--stats", action="store_true",
+                        help="include search statistics in each result")
+    parser.add_argument("--time-limit", type=float,
+                        help="seconds allowed for each line")
+    parser.add_argument("--node-limit", type=int,
+                        help="positions searched for each line")
+    args = parser.parse_args(argv)
+    if args.maxsize < 1:
+        parser.error("--maxsize must be at least 1")
+    if args.stats and (args.time_limit is not None or
+                       args.node_limit is not None):
+        parser.error("--stats cannot be combined with a time or node limit")
+    try:
+        MoveTable.for_rows(args.rows)
+    except ValueError as error:
+        parser.error(str(error))
+    for result in solve_lines(args.file, args.rows, args.maxsize,
+                              args.stats, args.time_limit, args.node_limit):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
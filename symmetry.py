@@ -0,0 +1,134 @@
+"""Maps boards and move sequences onto canonical representatives under the
+six symmetries of the triangular board."""
+
+from itertools import permutations
+
+class Symmetries:
+    """Rotations and reflections of the board described by a 'MoveTable'.
+
+    Transform 0 is always the identity. Every transform maps hole 'i' to
+    hole 'hole_maps[t][i]' and move 'i' to move 'move_maps[t][i]', and
+    'inverse[t]' undoes transform 't'.
+    """
+
+    _CHUNK = 8
+    _DIRECT_HOLES = 16
+    _cache = {}
+
+    def __init__(self, table):
+        """Initialize self. See help(type(self)) for accurate signature."""
+        self.table = table
+        rows = max(y for x, y in table.holes)//2 + 1
+        # Barycentric coordinates of each hole; permuting them gives the
+        # three rotations and three reflections of the triangle.
+        coords = []
+        for x, y in table.holes:
+            row = y//2
+            pos = (x - row)//2
+            coords.append((row, pos, rows - 1 - row - pos))
+        self.hole_maps = []
+        for order in permutations(range(3)):
+            hole_map = []
+            for coord in coords:
+                row, pos = coord[order[0]], coord[order[1]]
+                hole_map.append(table.hole_index[(row + 2*pos, 2*row)])
+            self.hole_maps.append(tuple(hole_map))
+        self.inverse = [self.hole_maps.index(tuple(sorted(
+            range(len(hole_map)), key=hole_map.__getitem__)))
+            for hole_map in self.hole_maps]
+        ends = {}
+        for i, (frm, over, to) in enumerate(table.masks):
+            ends[(frm, to)] = i
+        self.move_maps = []
+        for hole_map in self.hole_maps:
+            move_map = []
+            for frm, over, to in table.masks:
+                frm = 1 << hole_map[frm.bit_length() - 1]
+                to = 1 << hole_map[to.bit_length() - 1]
+                move_map.append(ends[(frm, to)])
+            self.move_maps.append(tuple(move_map))
+        # Per-chunk lookup tables so that a transform costs a few list
+        # lookups instead of a loop over every hole.
+        chunk = __class__._CHUNK
+        self._lookups = []
+        for hole_map in self.hole_maps:
+            lookups = []
+            for shift in range(0, len(hole_map), chunk):
+                lookup = []
+                for value in range(1 << chunk):
+                    bits = 0
+                    for i in range(chunk):
+                        if value >> i & 1 and shift + i < len(hole_map):
+                            bits |= 1 << hole_map[shift + i]
+                    lookup.append(bits)
+                lookups.append((shift, lookup))
+            self._lookups.append(tuple(lookups))
+        # Small boards get every canonical form precomputed, turning
+        # 'canonical' into a single list lookup.
+        if len(table.holes) <= __class__._DIRECT_HOLES:
+            direct = [self.canonical(bits) for bits in range(table.full + 1)]
+            self.canonical = direct.__getitem__
+
+    @classmethod
+    def of(cls, table):
+        """Returns the (shared) 'Symmetries' of 'table'."""
+        try:
+            return cls._cache[id(table)]
+        except KeyError:
+            symmetries = cls._cache[id(table)] = cls(table)
+            return symmetries
+
+    def transform(self, bits, transform):
+        """Applies 'transform' to the board 'bits'."""
+        mask = (1 << __class__._CHUNK) - 1
+        result = 0
+        for shift, lookup in self._lookups[transform]:
+            result |= lookup[bits >> shift & mask]
+        return result
+
+    def canonical(self, bits):
+        """Returns the canonical representative of 'bits' and the
+        transform that maps 'bits' onto it."""
+        best, best_transform = bits, 0
+        for transform in range(1, len(self.hole_maps)):
+            image = self.transform(bits, transform)
+            if image < best:
+                best, best_transform = image, transform
+        return best, best_transform
+
+    def transform_moves(self, indices, transform):
+        """Applies 'transform' to a sequence of move indices."""
+        move_map = self.move_maps[transform]
+        return [move_map[index] for index in indices]
+
+    def canonical_moves(self, indices, start=None):
+        """Returns the canonical representative of a move sequence played
+        from 'start' and the transform that maps it there.
+
+        Only transforms that also map 'start' onto its canonical
+        representative compete, so the result is a valid game from the
+        canonical start position.
+        """
+        if start is None:
+            start = self.table.start
+        indices = list(indices)
+        candidates = []
+        for transform in range(len(self.hole_maps)):
+            candidates.append((self.transform(start, transform),
+                               self.transform_moves(indices, transform),
+                               transform))
+        start, indices, transform = min(candidates)
+        return indices, transform
+
+    def canonical_path(self, moves, start=None):
+        """Like 'canonical_moves', but for '(peg, move)' tuples."""
+        indices = [self.table.move_index[move] for move in moves]
+        indices, transform = self.canonical_moves(indices, start)
+        return [self.table.moves[index] for index in indices], transform
+
+    def restore_path(self, moves, transform):
+        """Maps '(peg, move)' tuples from the canonical frame back through
+        the inverse of 'transform'."""
+        move_map = self.move_maps[self.inverse[transform]]
+        return [self.table.moves[move_map[self.table.move_index[move]]] for
+                move in moves]